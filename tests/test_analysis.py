@@ -135,6 +135,492 @@ def test_bonus(test_name, capsys):
     assert len(optcode) != 0
     assert (round(len(gencode)/len(optcode), 2) > ref_speedup) or (len(optcode) <= ref_opt)
 
+# Programas que exercitam as otimizações do DataFlow, com as opções usadas.
+# O código otimizado deve ter a mesma saída e o mesmo código de retorno que
+# o código não otimizado, e a saída deve ser a esperada
+equivalence = [
+    ("opt_defuse", {}),
+    ("opt_coalesce", {}),
+    ("opt_coalesce_args", {}),
+    ("opt_peephole", {}),
+    ("opt_peephole_args", {}),
+    ("opt_unroll", {}),
+    ("opt_unroll", {"unroll_budget": 64}),
+    ("opt_unroll", {"unroll_factor": 3}),
+    ("opt_unroll_pointer", {}),
+    ("opt_unroll_pointer", {"unroll_budget": 64}),
+    ("opt_unreachable", {}),
+    ("opt_tombstone", {}),
+    ("opt_ssa", {}),
+    ("opt_ssa", {"unroll_threshold": 0}),
+    ("opt_sccp", {}),
+    ("opt_sccp", {"unroll_threshold": 0}),
+    ("opt_gvn", {}),
+    ("opt_gvn", {"inline_threshold": 0}),
+    ("opt_licm", {}),
+    ("opt_licm", {"unroll_threshold": 0}),
+    ("opt_strength", {}),
+    ("opt_strength", {"unroll_factor": 2}),
+    ("opt_inline", {}),
+    ("opt_inline", {"inline_threshold": 0}),
+    ("opt_inline", {"inline_threshold": 100}),
+    ("opt_tailrec", {}),
+    ("opt_tailrec", {"inline_threshold": 0}),
+    ("opt_cfg", {}),
+    ("opt_cfg", {"inline_threshold": 0}),
+    ("opt_dce", {}),
+    ("opt_dce", {"inline_threshold": 0}),
+    ("opt_globals", {}),
+    ("opt_globals", {"inline_threshold": 0, "unroll_threshold": 0}),
+    ("opt_globals_calls", {}),
+    ("opt_globals_calls", {"inline_threshold": 0}),
+    ("opt_specialize", {}),
+    ("opt_specialize", {"inline_threshold": 0}),
+    ("opt_specialize", {"inline_threshold": 0, "specialize_threshold": 0}),
+    ("opt_specialize_void", {}),
+    ("opt_specialize_void", {"inline_threshold": 0}),
+    ("opt_deadfunc", {}),
+    ("opt_deadfunc", {"inline_threshold": 0}),
+    ("opt_strings", {}),
+    ("opt_strings", {"inline_threshold": 0}),
+    ("opt_algebra", {}),
+    ("opt_algebra", {"inline_threshold": 0}),
+    ("opt_shortcircuit", {}),
+    ("opt_shortcircuit", {"inline_threshold": 0}),
+    ("opt_rotate", {}),
+    ("opt_rotate", {"rotate_threshold": 0}),
+    ("opt_rotate", {"rotate_threshold": 8, "unroll_threshold": 0}),
+    ("opt_onepass", {}),
+    ("opt_onepass", {"inline_threshold": 0}),
+    ("opt_fold", {}),
+    ("opt_renumber", {}),
+    ("opt_renumber", {"inline_threshold": 0}),
+]
+
+def resolve_equivalence_files(test_name):
+    current_dir = Path(__file__).parent.absolute()
+    input_path = current_dir / Path("in-out") / Path(test_name + ".in")
+    expected_path = current_dir / Path("in-out") / Path(test_name + ".out")
+    assert input_path.exists()
+    assert expected_path.exists()
+    return input_path, expected_path
+
+def run_code(code):
+    cap_stdout = io.StringIO()
+    with redirect_stdout(cap_stdout):
+        code_err = run_with_timeout(code)
+    return cap_stdout.getvalue(), code_err
+
+def generate_code(input_path, options):
+    p = UCParser(debug=False)
+    with open(input_path) as f_in:
+        ast = p.parse(f_in.read())
+    sema = Visitor()
+    sema.visit(ast)
+    gen = CodeGenerator(False)
+    gen.visit(ast)
+    opt = DataFlow(False, **options)
+    opt.visit(ast)
+    return gen.code, opt
+
+@pytest.mark.timeout(30)
+@pytest.mark.parametrize(
+    "test_name, options", equivalence
+)
+def test_equivalence(test_name, options):
+    input_path, expected_path = resolve_equivalence_files(test_name)
+    gencode, opt = generate_code(input_path, options)
+    with open(expected_path) as f_ex:
+        expect = f_ex.read()
+
+    output, code_err = run_code(gencode)
+    assert output == expect
+    assert run_code(opt.code) == (output, code_err)
+
+@pytest.mark.timeout(30)
+@pytest.mark.parametrize(
+    "test_name, options", equivalence
+)
+def test_function_layout(test_name, options):
+    input_path, _ = resolve_equivalence_files(test_name)
+    _, opt = generate_code(input_path, options)
+
+    # Toda instrução de uma função fica num bloco, depois de uma label
+    for _define, _first in zip(opt.code, opt.code[1:]):
+        if _define[0].startswith("define_"):
+            assert _first[0].endswith(":")
+
+def get_function(code, name):
+    # Instruções de uma função do código gerado, da definição até a próxima
+    _start = [x for x, inst in enumerate(code) if inst[0].startswith("define_") and inst[1] == name][0]
+    _end = _start + 1
+    while _end < len(code) and not code[_end][0].startswith("define_"):
+        _end += 1
+    return code[_start:_end]
+
+def check_defuse(gencode, opt):
+    # As cópias entre variáveis são resolvidas pelas cadeias def-uso: não
+    # sobra acesso à memória e todo valor impresso é um literal
+    _main = get_function(opt.code, "@main")
+    _literals = {x[-1] for x in _main if x[0].startswith("literal_")}
+    assert not [x for x in _main if x[0].startswith(("load_", "store_", "alloc_"))]
+    assert all(x[1] in _literals for x in _main if x[0] == "print_int")
+
+def check_tombstone(gencode, opt):
+    # Os temporários mortos do laço são removidos e nenhuma lápide chega
+    # ao código final
+    _main = get_function(opt.code, "@main")
+    assert None not in opt.code
+    assert not [x for x in _main if x[0] in ("mul_int", "sub_int")]
+
+def check_ssa(gencode, opt):
+    # As variáveis locais vivem em registradores e os phis da forma SSA
+    # já foram desfeitos em cópias
+    _main = get_function(opt.code, "@main")
+    assert not [x for x in _main if x[0].startswith(("alloc_", "store_", "phi_"))]
+
+def check_sccp(gencode, opt):
+    # Os testes com valor constante e as contas sobre constantes somem;
+    # o que sobra são o laço e a soma que depende dele
+    _main = get_function(opt.code, "@main")
+    assert not [x for x in _main if x[0] in ("eq_int", "gt_int", "mul_int", "div_int", "mod_int")]
+
+def check_gvn(gencode, opt):
+    # x * y é calculado uma vez só, valendo para os dois lados do if
+    _f = get_function(opt.code, "@f")
+    assert len([x for x in _f if x[0] == "mul_int"]) == 1
+
+def check_licm(gencode, opt):
+    # n * 3 + 2 e a leitura de @n saem dos laços para a entrada, mas as
+    # divisões que podem falhar continuam nos blocos protegidos pelos ifs
+    _entry, *_blocks = split_blocks(get_function(opt.code, "@main"))[1:]
+    assert ("load_int", "@n") in [x[:2] for x in _entry]
+    assert "mul_int" in [x[0] for x in _entry]
+    assert "div_int" not in [x[0] for x in _entry]
+    for _block in _blocks:
+        assert not [x for x in _block if x[0] == "mul_int" or x[:2] == ("load_int", "@n")]
+
+def get_loop_bodies(code):
+    # Blocos que terminam com um desvio condicional para si mesmos
+    _bodies = []
+    for _block in split_blocks(code):
+        if _block[-1][0] == "cbranch" and "%" + _block[0][0][:-1] in _block[-1][2:]:
+            _bodies.append(_block)
+    return _bodies
+
+def check_strength(gencode, opt):
+    # Algum laço percorre os vetores com ponteiros que avançam a cada
+    # iteração, sem calcular o endereço com elem
+    _bodies = get_loop_bodies(get_function(opt.code, "@main"))
+    assert any(
+        not [x for x in _block if x[0].startswith("elem_")]
+        and [x for x in _block if x[0] in ("load_int_*", "store_int_*")]
+        for _block in _bodies
+    )
+
+def check_unroll(gencode, opt):
+    # O laço de três iterações é desenrolado: sobram os outros dois laços
+    # e o produto p vira a constante 8
+    _main = get_function(opt.code, "@main")
+    _literals = {x[-1]: x[1] for x in _main if x[0] == "literal_int"}
+    assert len(get_loop_bodies(_main)) == 2
+    assert _literals.get([x for x in _main if x[0] == "print_int"][-1][1]) == 8
+
+def check_inline(gencode, opt):
+    # As funções pequenas são expandidas nas chamadas e deixam de existir
+    _calls = {x[1] for x in opt.code if x[0].startswith("call_")}
+    _defines = {x[1] for x in opt.code if x[0].startswith("define_")}
+    assert not _calls & {"@sq", "@bump"}
+    assert not _defines & {"@sq", "@bump"}
+    if opt.inline_threshold >= 100:
+        assert not _calls and _defines == {"@main"}
+
+def check_tailrec(gencode, opt):
+    # As chamadas recursivas em cauda viram laços; a de fact, que ainda
+    # multiplica o resultado, continua sendo uma chamada
+    for _name in ("@sum", "@gcd"):
+        assert not [x for x in get_function(opt.code, _name) if x[0].startswith("call_")]
+    assert ("call_int", "@fact") in [x[:2] for x in get_function(opt.code, "@fact")]
+
+def check_cfg(gencode, opt):
+    # Nenhum bloco só repassa o controle com um jump, nenhum jump vai para
+    # a label seguinte, os blocos alcançados só por fluxo direto são
+    # juntados ao anterior e a variável não usada some
+    _walk = get_function(opt.code, "@walk")
+    _targets = {y[1:] for x in _walk if x[0] in ("jump", "cbranch") for y in x[1:] if y.startswith("%")}
+    assert all(x[0][:-1] in _targets for x in _walk[2:] if len(x) == 1 and x[0].endswith(":"))
+    for _block in split_blocks(_walk)[1:]:
+        assert len(_block) > 2 or _block[-1][0] != "jump"
+    for inst, _next in zip(_walk, _walk[1:]):
+        assert not (inst[0] == "jump" and _next == (inst[1][1:] + ":",))
+    assert ("alloc_int", "%unused") not in _walk
+
+def check_unreachable(gencode, opt):
+    # O código depois dos returns some, e cada função tem um único return
+    for _name in ("@sign", "@twice"):
+        _code = get_function(opt.code, _name)
+        assert not [x for x in _code if x[0].startswith("print_")]
+        assert len([x for x in _code if x[0].startswith("return_")]) == 1
+
+def check_dce(gencode, opt):
+    # As contas cujo resultado não é usado somem, mas a chamada que altera
+    # as globais fica
+    _main = get_function(opt.code, "@main")
+    assert not [x for x in _main if x[0] == "mul_int"]
+    assert [x[1] for x in _main if x[0].startswith("call_")] == ["@swapg", "@swapg"]
+
+def get_copies(code):
+    # Cópias entre registradores temporários
+    return [x for x in code if x[0] == "load_int" and x[1][1:].isdigit()]
+
+def check_coalesce(gencode, opt):
+    # A troca de a e b no laço usa só as três cópias necessárias
+    _main = get_function(opt.code, "@main")
+    _loop = [x for _block in split_blocks(_main)[2:] for x in _block if _block[0] != ("exit:",)]
+    assert len(get_copies(_loop)) == 3
+
+def check_coalesce_args(gencode, opt):
+    # O argumento e o registrador do retorno são o mesmo
+    assert not get_copies(get_function(opt.code, "@f1"))
+
+def check_globals(gencode, opt):
+    # O laço sem chamadas soma em registradores: @h é lido antes dele e
+    # gravado uma vez só, depois dele
+    _main = get_function(opt.code, "@main")
+    for _block in get_loop_bodies(_main):
+        assert not [x for x in _block if x[0] in ("load_int", "store_int") and "@h" in x]
+    assert len([x for x in _main if x[:2] == ("load_int", "@h")]) == 1
+    assert len([x for x in _main if x[0] == "store_int" and x[2] == "@h"]) == 1
+
+def check_globals_calls(gencode, opt):
+    # Nenhum dos dois laços acessa as globais: o que só faz chamadas deixa
+    # @g na memória, e o outro lê @h uma vez, antes do laço
+    _main = get_function(opt.code, "@main")
+    _bodies = get_loop_bodies(_main)
+    assert len(_bodies) == 2
+    for inst in [x for _block in _bodies for x in _block]:
+        assert not (inst[0] in ("load_int", "store_int") and ("@g" in inst or "@h" in inst))
+    assert [x[1] for x in _main if x[0] == "load_int" and x[1].startswith("@")] == ["@h", "@g", "@h"]
+    assert not [x for x in _main if x[0] == "store_int"]
+
+def check_specialize(gencode, opt):
+    # Cada modo de scale ganha uma cópia sem o teste do modo, e n, que é
+    # sempre 3, deixa de ser argumento de poly
+    _defines = {x[1]: x for x in opt.code if x[0].startswith("define_")}
+    assert "@scale" not in _defines
+    assert len(_defines["@poly"][2]) == 1
+    _one = get_function(opt.code, "@scale.spec.1")
+    _two = get_function(opt.code, "@scale.spec.2")
+    assert [x[0] for x in _one if x[0] in ("mul_int", "add_int", "cbranch")] == ["mul_int"]
+    assert [x[0] for x in _two if x[0] in ("mul_int", "add_int", "cbranch")] == ["add_int"]
+
+def check_specialize_void(gencode, opt):
+    # Só as chamadas dentro do laço passam a usar as cópias especializadas
+    _calls = [x[1] for x in opt.code if x[0] == "call_void"]
+    assert _calls == ["@add.spec.1", "@add.spec.2", "@add", "@add"]
+
+def check_deadfunc(gencode, opt):
+    # Funções que @main não alcança e globais que nenhuma função usa somem
+    _names = {x[1] for x in opt.code if x[0].startswith(("define_", "global_"))}
+    assert _names == {"@used", "@table", "@.str.1", "@helper", "@main"}
+
+def check_strings(gencode, opt):
+    # v e w usam o mesmo vetor constante e cada texto vira uma só global
+    for code in (gencode, opt.code):
+        _globals = [x for x in code if x[0].startswith("global_")]
+        assert [x[1] for x in _globals if x[0] == "global_int_3"] == ["@.const_v.0"]
+        _strings = [x[2] for x in _globals if x[0] == "global_string"]
+        assert len(_strings) == len(set(_strings)) == 6
+
+def check_peephole(gencode, opt):
+    # A soma com zero dos índices i * n + j sai pela regra add_zero
+    assert opt.peephole_counts["add_zero"] > 0
+
+def check_algebra(gencode, opt):
+    # As identidades somem, x == x && y <= y vira verdadeiro e as cadeias
+    # de constantes viram uma só operação: y + 7 e a * 6
+    _f = get_function(opt.code, "@f")
+    assert not [x for x in _f if x[0].split("_")[0] in ("sub", "div", "mod", "eq", "le", "and", "cbranch")]
+    _literals = {x[-1]: x[1] for x in _f if x[0] == "literal_int"}
+    assert [_literals[x[2]] for x in _f if x[0] == "mul_int"] == [6]
+    assert 7 in _literals.values()
+
+def check_shortcircuit(gencode, opt):
+    # && e || nas condições viram desvios: o lado direito fica num bloco
+    # próprio e nenhum and/or é calculado
+    _labels = [x[0] for x in gencode if len(x) == 1 and x[0].endswith(":")]
+    assert not [x for x in gencode if x[0] in ("and_bool", "or_bool")]
+    assert [x for x in _labels if x.startswith("and.rhs")] and [x for x in _labels if x.startswith("or.rhs")]
+    assert not [x for x in opt.code if x[0] in ("and_bool", "or_bool")]
+
+def check_rotate(gencode, opt):
+    # Os laços de tri viram do-while: o teste fica no fim do corpo, num
+    # único desvio condicional, e não sobra jump de volta ao cabeçalho
+    _tri = get_function(opt.code, "@tri")
+    _jumps = [x for x in _tri if x[0] == "jump"]
+    if opt.rotate_threshold == 0:
+        assert _jumps
+        return
+    assert not _jumps
+    _bodies = get_loop_bodies(_tri)
+    assert _bodies
+    for _block in _bodies:
+        assert [x[0] for x in _block].count("cbranch") == 1
+
+def check_onepass(gencode, opt):
+    # Os allocs de todas as declarações, inclusive as de blocos internos,
+    # ficam juntos no início da entrada, e cada inicializador é gravado
+    # uma vez só, no ponto da declaração
+    _main = get_function(gencode, "@main")
+    _allocs = [x[1] for x in _main[2:] if x[0].startswith("alloc_")]
+    assert [x[1] for x in _main[2:2 + len(_allocs)]] == _allocs
+    assert sorted(_allocs) == sorted(["%1", "%v", "%y", "%x", "%z", "%w", "%q", "%t", "%i", "%u"])
+    for _var in ("%v", "%x", "%z", "%q", "%t", "%u"):
+        assert len([x for x in _main if x[0].startswith("store_") and x[2] == _var]) == 1
+
+def check_fold(gencode, opt):
+    # As subexpressões constantes viram literais já na geração de código,
+    # com a semântica de // e % do interpretador e comparações booleanas;
+    # só a divisão por zero fica para o tempo de execução
+    _main = get_function(gencode, "@main")
+    _literals = [x for x in _main if x[0].startswith("literal_")]
+    assert not [x for x in _main if x[0] in ("mul_int", "mod_int")]
+    assert [x[0] for x in _main if x[0] == "div_int"] == ["div_int"]
+    assert {24, 4, -4, 2} <= {x[1] for x in _literals if x[0] == "literal_int"}
+    assert [x[1] for x in _literals if x[0] == "literal_bool"] == [True, False]
+    for inst in _literals:
+        assert (inst[0] == "literal_bool") == isinstance(inst[1], bool)
+
+def get_registers(code):
+    # Registradores temporários usados por uma função, incluindo os argumentos
+    _regs = {y for x in code for y in x[1:] if isinstance(y, str) and y[1:].isdigit()}
+    return _regs | {y[1] for x in code if x[0].startswith("define_") for y in x[2]}
+
+def check_renumber(gencode, opt):
+    # Os registradores de cada função são renumerados em sequência a partir
+    # de %1 e são menos do que os do código não otimizado
+    _names = [x[1] for x in gencode if x[0].startswith("define_")]
+    for _name in [x[1] for x in opt.code if x[0].startswith("define_")]:
+        _regs = get_registers(get_function(opt.code, _name))
+        assert _regs == {"%" + str(x) for x in range(1, len(_regs) + 1)}
+        if _name in _names:
+            assert len(_regs) < len(get_registers(get_function(gencode, _name)))
+
+# Programas cujo código otimizado deve mostrar o efeito de uma otimização
+# específica: nome do programa, opções do DataFlow e a verificação
+feature = [
+    ("opt_defuse", {}, check_defuse),
+    ("opt_tombstone", {}, check_tombstone),
+    ("opt_ssa", {}, check_ssa),
+    ("opt_ssa", {"unroll_threshold": 0}, check_ssa),
+    ("opt_sccp", {}, check_sccp),
+    ("opt_sccp", {"unroll_threshold": 0}, check_sccp),
+    ("opt_gvn", {"inline_threshold": 0}, check_gvn),
+    ("opt_licm", {}, check_licm),
+    ("opt_licm", {"unroll_threshold": 0}, check_licm),
+    ("opt_unroll", {"unroll_budget": 64}, check_unroll),
+    ("opt_strength", {}, check_strength),
+    ("opt_inline", {}, check_inline),
+    ("opt_inline", {"inline_threshold": 100}, check_inline),
+    ("opt_tailrec", {"inline_threshold": 0}, check_tailrec),
+    ("opt_cfg", {"inline_threshold": 0}, check_cfg),
+    ("opt_unreachable", {"inline_threshold": 0}, check_unreachable),
+    ("opt_dce", {"inline_threshold": 0}, check_dce),
+    ("opt_coalesce", {}, check_coalesce),
+    ("opt_coalesce_args", {}, check_coalesce_args),
+    ("opt_globals", {"inline_threshold": 0, "unroll_threshold": 0}, check_globals),
+    ("opt_globals_calls", {"inline_threshold": 0}, check_globals_calls),
+    ("opt_specialize", {"inline_threshold": 0}, check_specialize),
+    ("opt_specialize_void", {"inline_threshold": 0}, check_specialize_void),
+    ("opt_deadfunc", {"inline_threshold": 0}, check_deadfunc),
+    ("opt_strings", {"inline_threshold": 0}, check_strings),
+    ("opt_peephole", {}, check_peephole),
+    ("opt_algebra", {"inline_threshold": 0}, check_algebra),
+    ("opt_shortcircuit", {"inline_threshold": 0}, check_shortcircuit),
+    ("opt_rotate", {"inline_threshold": 0}, check_rotate),
+    ("opt_rotate", {"inline_threshold": 0, "rotate_threshold": 0}, check_rotate),
+    ("opt_onepass", {}, check_onepass),
+    ("opt_fold", {}, check_fold),
+    ("opt_renumber", {}, check_renumber),
+    ("opt_renumber", {"inline_threshold": 0}, check_renumber),
+]
+
+@pytest.mark.timeout(30)
+@pytest.mark.parametrize(
+    "test_name, options, check", feature
+)
+def test_feature(test_name, options, check):
+    input_path, _ = resolve_equivalence_files(test_name)
+    gencode, opt = generate_code(input_path, options)
+    check(gencode, opt)
+
+def split_blocks(code):
+    blocks = []
+    for inst in code:
+        if len(inst) == 1 and inst[0].endswith(":") or inst[0].startswith("define_"):
+            blocks.append([])
+        if blocks:
+            blocks[-1].append(inst)
+    return blocks
+
+@pytest.mark.parametrize(
+    "opcode, value", [("eq_bool", True), ("ne_bool", False)]
+)
+def test_compare_bool_to_itself(opcode, value):
+    opt = DataFlow(False)
+    opt.enumerated_code = [
+        ("define_int", "@f", [("int", "%1"), ("int", "%2")]),
+        ("entry:",),
+        ("lt_int", "%1", "%2", "%3"),
+        (opcode, "%3", "%3", "%4"),
+        ("cbranch", "%4", "%then", "%else"),
+    ]
+    opt.count_temps()
+    opt.algebraic_simplification()
+
+    # A comparação de um booleano com ele mesmo vira um literal
+    _code = [x for x in opt.enumerated_code if x is not None]
+    assert _code[2:] == [("literal_bool", value, "%4"), ("cbranch", "%4", "%then", "%else")]
+
+# Programas que falham com uma divisão por zero, cujo resultado não é
+# usado. O código otimizado deve manter a falha, depois da mesma saída
+trap = [
+    "opt_divzero",
+    "opt_divzero_loop",
+]
+
+@pytest.mark.timeout(30)
+@pytest.mark.parametrize(
+    "test_name", trap
+)
+def test_division_by_zero(test_name):
+    input_path, expected_path = resolve_equivalence_files(test_name)
+    gencode, opt = generate_code(input_path, {})
+    with open(expected_path) as f_ex:
+        expect = f_ex.read()
+
+    for code in (gencode, opt.code):
+        cap_stdout = io.StringIO()
+        with redirect_stdout(cap_stdout), pytest.raises(ZeroDivisionError):
+            run_with_timeout(code)
+        assert cap_stdout.getvalue() == expect
+
+def test_single_exit_jump():
+    input_path, _ = resolve_equivalence_files("opt_unreachable")
+
+    p = UCParser(debug=False)
+    with open(input_path) as f_in:
+        ast = p.parse(f_in.read())
+    sema = Visitor()
+    sema.visit(ast)
+    gen = CodeGenerator(False)
+    gen.visit(ast)
+
+    # O salto para o retorno deve ser emitido uma única vez
+    _exit = ("jump", "%exit")
+    for _prev, _inst in zip(gen.code, gen.code[1:]):
+        assert not (_prev == _exit and _inst == _exit)
+
 def speedup_points():
     total_grade = 0
     for test_name in name:
@@ -3,8 +3,8 @@ import pathlib
 import sys
 from typing import List, Tuple
 from uc.uc_ast import FuncDef, Node
-from uc.uc_block import CFG, format_instruction
-from uc.uc_code import CodeGenerator, EmitBlocks
+from uc.uc_block import CFG, BasicBlock, ConditionBlock, format_instruction
+from uc.uc_code import CodeGenerator, EmitBlocks, constant_folding
 from uc.uc_interpreter import Interpreter
 from uc.uc_parser import UCParser
 from uc.uc_sema import NodeVisitor, Visitor
@@ -12,10 +12,50 @@ import json
 
 from pprint import pprint
 
+# Operações binárias da uCIR (uso de dois registradores e definição de um)
+binary_ops = ("add", "sub", "mul", "div", "mod", "lt", "le", "gt", "ge", "eq", "ne", "and", "or")
+
+# Regras do otimizador peephole: nome da regra e tamanho da janela. Cada
+# regra é implementada pelo método DataFlow.peephole_<nome>, que recebe a
+# janela de instruções e devolve as instruções que a substituem, ou None se
+# a regra não se aplica
+peephole_rules = (
+    ("jump_to_next_label", 2),
+    ("self_copy", 1),
+    ("not_cbranch", 2),
+    ("add_zero", 1),
+    ("sitofp_fptosi", 2),
+    ("store_after_load", 2),
+    ("load_after_store", 2),
+    ("repeated_store", 2),
+)
+
 class DataFlow(NodeVisitor):
-    def __init__(self, viewcfg: bool):
+    def __init__(
+        self,
+        viewcfg: bool,
+        unroll_threshold: int = 8,
+        unroll_factor: int = 1,
+        unroll_budget: int = 32,
+        inline_threshold: int = 20,
+        specialize_threshold: int = 40,
+        rotate_threshold: int = 2,
+    ):
         # flag to show the optimized control flow graph
         self.viewcfg: bool = viewcfg
+        # loop unrolling: max trip count to fully unroll, copies of the body
+        # for partial unrolling and max number of instructions added per loop
+        self.unroll_threshold: int = unroll_threshold
+        self.unroll_factor: int = unroll_factor
+        self.unroll_budget: int = unroll_budget
+        # function inlining: max size of an inlined function
+        self.inline_threshold: int = inline_threshold
+        # function specialization: max size of a function cloned for the
+        # constant arguments of a call inside a loop
+        self.specialize_threshold: int = specialize_threshold
+        # loop rotation: max number of instructions of a loop test copied
+        # to the end of the loop
+        self.rotate_threshold: int = rotate_threshold
         # list of code instructions after optimizations
         self.code: List[Tuple[str]] = []
         
@@ -31,7 +71,29 @@ class DataFlow(NodeVisitor):
         self.lv_in: dict = {}
         self.lv_out: dict = {}
 
+        # Def-Use Chains
+        self.du_defs: dict = {}
+        self.du_uses: dict = {}
+
+        # Dominator Tree
+        self.rpo: List = []
+        self.idom: dict = {}
+        self.dom_children: dict = {}
+        self.dom_frontier: dict = {}
+
+        # Peephole: number of times each rule was applied, number of uses of
+        # each register and registers whose only definition is a literal
+        self.peephole_counts: dict = {x: 0 for x, _ in peephole_rules}
+        self.peephole_uses: dict = {}
+        self.peephole_literals: dict = {}
+
+        # Interprocedural
+        self.inline_code: dict = {}
+        self.call_counts: dict = {}
+
         # Misc
+        self.temp_count: int = 0
+        self.label_count: int = 0
         self.definitions: dict = {}
         self.predecessors: dict = {}
         self.sucessors: dict = {}
@@ -93,6 +155,105 @@ class DataFlow(NodeVisitor):
         list_inst[idx] = field
         return tuple(list_inst)
 
+    def get_use_fields(self, inst):
+        """
+        Recupera os índices dos campos de uma instrução que são lidos.
+        """
+        if inst is None or len(inst) == 1:
+            return []
+
+        _op = inst[0].split("_")
+        _has_modifier = len(_op) > 2
+
+        if _op[0] == "phi":
+            return list(range(1, len(inst) - 1, 2))
+        if _op[0] in binary_ops or _op[0] == "elem":
+            return [1, 2]
+        if _op[0] == "store" and _has_modifier:
+            return [1, 2]
+        if _op[0] == "read":
+            return [1] if _has_modifier else []
+        if _op[0] in ("load", "store", "get", "not", "sitofp", "fptosi", "param", "return", "print", "cbranch"):
+            return [1]
+        return []
+
+    def get_def_field(self, inst):
+        """
+        Recupera o índice do campo de uma instrução que é escrito.
+        """
+        if inst is None or len(inst) == 1:
+            return None
+
+        _op = inst[0].split("_")
+        _has_modifier = len(_op) > 2
+
+        if _op[0] in ("store", "read") and _has_modifier:
+            return None
+        if _op[0] in ("alloc", "read"):
+            return 1
+        if _op[0] in ("define", "global", "jump", "cbranch", "param", "return", "print"):
+            return None
+        return len(inst) - 1
+
+    def build_def_use(self):
+        """
+        Constrói as cadeias def-uso de temporários e variáveis.
+        """
+        self.du_defs = {}
+        self.du_uses = {}
+
+        for index in range(len(self.enumerated_code)):
+            self.add_def_use(index)
+
+    def add_def_use(self, index):
+        """
+        Adiciona uma instrução às cadeias def-uso.
+        """
+        inst = self.enumerated_code[index]
+
+        for _field in self.get_use_fields(inst):
+            _reg = inst[_field]
+            if _reg not in self.du_uses:
+                self.du_uses[_reg] = []
+            self.du_uses[_reg].append(index)
+
+        _field = self.get_def_field(inst)
+        if _field is not None:
+            _reg = inst[_field]
+            if _reg not in self.du_defs:
+                self.du_defs[_reg] = []
+            self.du_defs[_reg].append(index)
+
+    def remove_def_use(self, index):
+        """
+        Remove uma instrução das cadeias def-uso.
+        """
+        inst = self.enumerated_code[index]
+
+        for _field in self.get_use_fields(inst):
+            if index in self.du_uses[inst[_field]]:
+                self.du_uses[inst[_field]].remove(index)
+
+        _field = self.get_def_field(inst)
+        if _field is not None:
+            self.du_defs[inst[_field]].remove(index)
+
+    def get_uses(self, reg):
+        """
+        Recupera as instruções que usam um registrador.
+        """
+        if reg not in self.du_uses:
+            return []
+        return self.du_uses[reg].copy()
+
+    def get_defs(self, reg):
+        """
+        Recupera as instruções que definem um registrador.
+        """
+        if reg not in self.du_defs:
+            return []
+        return self.du_defs[reg].copy()
+
     def add_definition(self, varName, idx):
         """
         Adiciona uma definição à lista de definições.
@@ -165,6 +326,17 @@ class DataFlow(NodeVisitor):
             return []
         return self.rd_kill[index].copy()
     
+    def get_label_indexes(self):
+        """
+        Mapeia o nome de cada label para o índice da sua instrução.
+        """
+        _labels = {}
+        for index in range(len(self.enumerated_code)):
+            inst = self.enumerated_code[index]
+            if inst is not None and len(inst) == 1 and inst[0].endswith(":"):
+                _labels[inst[0][:-1]] = index
+        return _labels
+
     def calculate_sucessors(self):
         """
         Recupera sucessores de uma instrução
@@ -180,34 +352,20 @@ class DataFlow(NodeVisitor):
             self.add_sucessor(index, index + 1)
 
         # Calcula os sucessores por jump
+        _labels = self.get_label_indexes()
         for _branch_index in range(len(self.enumerated_code)):
             inst = self.enumerated_code[_branch_index]
+            if inst is None:
+                continue
 
             # inst == jump: Coloca endereço pulante como sucessor do atual
             if inst[0].startswith("jump"):
-                _label = inst[1][1:]
+                self.add_sucessor(_branch_index, _labels[inst[1][1:]])
 
-                for _label_idx in range(len(self.enumerated_code)):
-                    if self.enumerated_code[_label_idx][0][:-1] == _label:
-                        self.add_sucessor(_branch_index, _label_idx)
-                        break
-                
             # inst == cbranch: Coloca como sucessor os endereços que ele pode pular
             elif inst[0] == "cbranch":
-                # true label
-                _true_label = inst[2][1:]
-                for _label_idx in range(len(self.enumerated_code)):
-                    if self.enumerated_code[_label_idx][0][:-1] == _true_label:
-                        self.add_sucessor(_branch_index, _label_idx)
-                        break
-
-                # false label
-                _false_label = inst[3][1:]
-                for _label_idx in range(len(self.enumerated_code)):
-                    if self.enumerated_code[_label_idx][0][:-1] == _false_label:
-                        self.add_sucessor(_branch_index, _label_idx)
-                        break
-
+                self.add_sucessor(_branch_index, _labels[inst[2][1:]])
+                self.add_sucessor(_branch_index, _labels[inst[3][1:]])
 
     def calculate_predecessors(self):
         """
@@ -224,33 +382,20 @@ class DataFlow(NodeVisitor):
             self.add_predecessor(index, index-1)
 
         # Calcula os predecessores por jump
+        _labels = self.get_label_indexes()
         for _branch_index in range(len(self.enumerated_code)):
             inst = self.enumerated_code[_branch_index]
+            if inst is None:
+                continue
 
             # inst == jump: Se coloca como predecessor da label para qual ele pula
             if inst[0].startswith("jump"):
-                _label = inst[1][1:]
+                self.add_predecessor(_labels[inst[1][1:]], _branch_index)
 
-                for _label_idx in range(len(self.enumerated_code)):
-                    if self.enumerated_code[_label_idx][0][:-1] == _label:
-                        self.add_predecessor(_label_idx, _branch_index)
-                        break
-                
             # inst == cbranch: Se coloca como predecessor das labels paras quais ele pode pular
             elif inst[0] == "cbranch":
-                # true label
-                _true_label = inst[2][1:]
-                for _label_idx in range(len(self.enumerated_code)):
-                    if self.enumerated_code[_label_idx][0][:-1] == _true_label:
-                        self.add_predecessor(_label_idx, _branch_index)
-                        break
-
-                # false label
-                _false_label = inst[3][1:]
-                for _label_idx in range(len(self.enumerated_code)):
-                    if self.enumerated_code[_label_idx][0][:-1] == _false_label:
-                        self.add_predecessor(_label_idx, _branch_index)
-                        break
+                self.add_predecessor(_labels[inst[2][1:]], _branch_index)
+                self.add_predecessor(_labels[inst[3][1:]], _branch_index)
 
     def get_predecessors(self, index):
         """
@@ -326,6 +471,9 @@ class DataFlow(NodeVisitor):
         self.lv_in = {}
         self.lv_out = {}
 
+        self.du_defs = {}
+        self.du_uses = {}
+
         self.definitions = {}
         self.enumerated_code = []
         self.predecessors = {}
@@ -333,39 +481,49 @@ class DataFlow(NodeVisitor):
     def visit_Program(self, node: Node):
         # First, save the global instructions on code member
         self.code = node.text[:]  # [:] to do a copy
+        _decls = {}
+        _functions = {}
         for _decl in node.gdecls:
             if isinstance(_decl, FuncDef):
-                # Reset global variables
-                self.reset_global_vars()
+                _name = "@" + _decl.decl.name.name
+                _decls[_name] = _decl
 
                 # Enumera as instruções do CFG
+                self.enumerated_code = []
                 self.enumerate_instructions(_decl.cfg)
-
-                # Remove loads desnessários de variáveis globais
-                self.optimized_global_int_variables()
-
-                # start with Reach Definitions Analysis
-                self.buildRD_blocks(_decl.cfg)
-                self.computeRD_gen_kill()
-                self.computeRD_in_out()
-                
-                # and do constant propagation optimization
-                self.constant_propagation()
-
-                # after do live variable analysis
-                self.buildLV_blocks(_decl.cfg)
-                self.computeLV_use_def()
-                self.computeLV_in_out()
-                # and do dead code elimination
-                self.deadcode_elimination()
-
-                # after that do cfg simplify (optional)
-                self.short_circuit_jumps(_decl.cfg)
-                self.merge_blocks(_decl.cfg)
-                self.discard_unused_allocs(_decl.cfg)
-
-                # finally save optimized instructions in self.code
-                self.appendOptimizedCode(_decl.cfg)
+                _functions[_name] = self.enumerated_code
+
+        # Propaga os argumentos constantes para as funções chamadas e cria
+        # as versões especializadas, que usam a declaração da original
+        for _clone, _name in self.propagate_constant_arguments(_functions).items():
+            _decls[_clone] = _decls[_name]
+
+        # Otimiza as funções das folhas para a raiz do grafo de chamadas,
+        # para que as chamadas já expandidas possam ser expandidas de novo
+        _optimized = {}
+        for _name in self.get_call_graph_order(_functions):
+            # Reset global variables
+            self.reset_global_vars()
+            self.enumerated_code = list(_functions[_name])
+
+            # Expande as chamadas de funções pequenas
+            self.inline_calls()
+            self.inline_code[_name] = list(self.enumerated_code)
+
+            self.optimize_function(_decls[_name])
+            _optimized[_name] = self.enumerated_code
+
+        # Descarta as funções que não são chamadas a partir de @main e as
+        # variáveis globais que nenhuma função usa
+        _live_functions, _live_globals = self.get_live_program(_optimized)
+        self.code = [x for x in self.code if x[1] in _live_globals]
+
+        for _name in _functions:
+            if _name not in _live_functions:
+                continue
+            # finally save optimized instructions in self.code
+            self.enumerated_code = _optimized[_name]
+            self.appendOptimizedCode(_decls[_name].cfg)
 
         if self.viewcfg:
             for _decl in node.gdecls:
@@ -373,25 +531,498 @@ class DataFlow(NodeVisitor):
                     dot = CFG(_decl.decl.name.name + ".opt")
                     dot.view(_decl.cfg)
 
-    def optimized_global_int_variables(self):
+    def optimize_function(self, decl):
         """
-        Remove loads desnecessários de variáveis globais.
+        Otimiza o código enumerado de uma função.
         """
-        _varName = None
-        # Itera sobre as instruções do bloco
-        for index in range(len(self.enumerated_code)):
-            # Recupera a instrução
-            inst = self.enumerated_code[index]
+        # Constrói as cadeias def-uso
+        self.build_def_use()
 
-            # Se for um load de uma variável global
-            if inst[0].startswith("load_int") and inst[1].startswith("@"):
-                _varName = inst[1]
-                _global_reg = inst[2]
+        # Constrói a forma SSA das variáveis escalares locais, incluindo
+        # as cópias locais das variáveis globais
+        self.count_temps()
+        self.promote_global_scalars()
+        self.construct_ssa()
 
-                # Tenta achar outro load da mesma variável global
-                self.cp_remove_similar_loads(index+1, _varName, _global_reg)
-                break
+        # Transforma as chamadas recursivas de cauda em laços
+        self.tail_recursion_elimination()
+
+        # Propagação de constantes condicional esparsa, refeita quando as
+        # simplificações algébricas criam novas constantes
+        self.sparse_conditional_constant_propagation()
+        if self.algebraic_simplification():
+            self.sparse_conditional_constant_propagation()
+
+        # Elimina computações redundantes
+        self.global_value_numbering()
+
+        # Move as computações invariantes para fora dos laços
+        self.loop_invariant_code_motion()
+
+        # Desenrola laços pequenos e refaz as propagações nas cópias
+        if self.loop_unrolling():
+            self.sparse_conditional_constant_propagation()
+            self.global_value_numbering()
+
+        # Reduz a força das variáveis de indução dos laços
+        self.strength_reduction()
+
+        # Volta para uCIR válida para o interpretador
+        self.destruct_ssa()
+
+        # Descarta os blocos que os desvios constantes deixaram inalcançáveis
+        self.remove_unreachable_blocks()
+
+        # Propagação de constantes, eliminação de código morto, junção de
+        # cópias e simplificação do CFG, repetidas até que o código não
+        # mude mais, já que cada uma pode deixar código morto para as outras
+        _old_code = None
+        while _old_code != self.get_live_code():
+            _old_code = self.get_live_code()
+
+            # start with Reach Definitions Analysis
+            self.buildRD_blocks(decl.cfg)
+            self.computeRD_gen_kill()
+            self.computeRD_in_out()
 
+            # and do constant propagation optimization
+            self.constant_propagation()
+
+            # after do live variable analysis and dead code elimination,
+            # until no more instructions are removed
+            _changed = True
+            while _changed:
+                self.lv_use = {}
+                self.lv_def = {}
+                self.lv_in = {}
+                self.lv_out = {}
+                self.buildLV_blocks(decl.cfg)
+                self.computeLV_use_def()
+                self.computeLV_in_out()
+                _changed = self.deadcode_elimination()
+                _changed = self.remove_dead_instructions() or _changed
+
+            # Junta os registradores ligados por cópias
+            self.coalesce_copies()
+
+            # after that do cfg simplify (optional)
+            self.remove_unreachable_blocks()
+            self.short_circuit_jumps()
+            self.merge_blocks()
+            self.discard_unused_allocs()
+
+        # Rotaciona os laços uma única vez, já que a rotação copia os testes
+        if self.loop_rotation():
+            self.merge_blocks()
+
+        # descarta as lápides das instruções removidas, já que o peephole
+        # compara instruções vizinhas
+        self.compact_instructions()
+
+        # Reescreve as sequências locais ineficientes
+        self.peephole_optimization()
+
+        # Reaproveita os nomes dos temporários que já morreram
+        self.renumber_registers()
+        self.compact_instructions()
+
+    def get_live_program(self, functions):
+        """
+        Recupera as funções alcançáveis a partir de @main pelo grafo de
+        chamadas e as variáveis globais referenciadas por elas. Sem @main,
+        todas as funções são mantidas.
+        """
+        if "@main" in functions:
+            _live = {"@main"}
+            _worklist = ["@main"]
+        else:
+            _live = set(functions)
+            _worklist = list(functions)
+        _globals = set()
+        while _worklist:
+            for inst in functions[_worklist.pop()]:
+                if inst[0].startswith("define_"):
+                    continue
+                for _field in inst[1:]:
+                    if isinstance(_field, str) and _field.startswith("@"):
+                        _globals.add(_field)
+                if inst[0].startswith("call_") and inst[1] in functions and inst[1] not in _live:
+                    _live.add(inst[1])
+                    _worklist.append(inst[1])
+        return _live, _globals
+
+    def get_call_graph_order(self, functions):
+        """
+        Ordena as funções das folhas para a raiz do grafo de chamadas
+        (pós-ordem de uma busca em profundidade) e conta as chamadas de
+        cada função. Em chamadas recursivas, a função chamada que ainda
+        está na pilha da busca fica depois de quem a chama.
+        """
+        _calls = {}
+        self.call_counts = {}
+        for _name, _code in functions.items():
+            _calls[_name] = []
+            for inst in _code:
+                if inst[0].startswith("call_"):
+                    _calls[_name].append(inst[1])
+                    self.call_counts[inst[1]] = self.call_counts.get(inst[1], 0) + 1
+
+        _order = []
+        _visited = set()
+        for _name in functions:
+            if _name in _visited:
+                continue
+            _visited.add(_name)
+            _stack = [(_name, iter(_calls[_name]))]
+            while _stack:
+                _current, _callees = _stack[-1]
+                _next = next(_callees, None)
+                if _next is None:
+                    _order.append(_current)
+                    _stack.pop()
+                elif _next in functions and _next not in _visited:
+                    _visited.add(_next)
+                    _stack.append((_next, iter(_calls[_next])))
+        return _order
+
+    def propagate_constant_arguments(self, functions):
+        """
+        Propagação interprocedural de constantes sobre o código ainda não
+        otimizado das funções. Um argumento que recebe o mesmo literal em
+        todas as chamadas vira um literal dentro da função e deixa de ser
+        passado. Chamadas dentro de laços que passam outros literais para
+        funções pequenas (até specialize_threshold instruções) passam a
+        chamar uma cópia especializada da função. Retorna o nome de cada
+        cópia criada e o da função original.
+        """
+        # Recupera os argumentos literais de cada chamada
+        _sites = {x: [] for x in functions}
+        for _caller, _code in functions.items():
+            _literals = {x[-1]: x for x in _code if x[0].startswith("literal_")}
+            self.enumerated_code = _code
+            cfg = self.build_cfg()
+            self.compute_dominators(cfg)
+            # Chamadas em laços, identificadas pelo bloco e pela posição
+            # dentro dele
+            _hot = set()
+            for _, _body in self.find_natural_loops(cfg):
+                for _block in _body:
+                    _hot.update((_block.label, x) for x, inst in enumerate(_block.instructions)
+                                if inst[0].startswith("call_"))
+            _label, _position = None, 0
+            for index in range(len(_code)):
+                inst = _code[index]
+                if self.is_label(inst):
+                    _label, _position = inst[0][:-1], 0
+                if inst[0].startswith("call_") and inst[1] in functions:
+                    _params = self.get_call_params(_code, index)
+                    _values = [_literals.get(_code[x][1]) for x in _params]
+                    _sites[inst[1]].append((_caller, index, _params, _values, (_label, _position) in _hot))
+                _position += 1
+
+        # Decide os argumentos constantes e as cópias especializadas
+        _drop = {x: set() for x in functions}
+        _rename = {x: {} for x in functions}
+        _bind = {}
+        _clones = {}
+        for _name, _calls in _sites.items():
+            _args = functions[_name][0][2]
+            if _name == "@main" or not _calls or any(len(x[2]) != len(_args) for x in _calls):
+                continue
+            _constants = {}
+            for _position in range(len(_args)):
+                _values = set(x[3][_position][:2] if x[3][_position] else None for x in _calls)
+                if len(_values) == 1 and None not in _values:
+                    _constants[_position] = _calls[0][3][_position]
+            if _constants:
+                _bind[_name] = _constants
+                for _caller, _, _params, _, _ in _calls:
+                    _drop[_caller].update(_params[x] for x in _constants)
+
+            if len(functions[_name]) > self.specialize_threshold:
+                continue
+            for _caller, index, _params, _values, _is_hot in _calls:
+                _extra = {x: y for x, y in enumerate(_values) if y is not None and x not in _constants}
+                if not _is_hot or _caller == _name or not _extra:
+                    continue
+                _key = (_name,) + tuple((x, y[0], y[1]) for x, y in sorted(_extra.items()))
+                if _key not in _clones:
+                    _clones[_key] = (_name + ".spec." + str(len(_clones) + 1), {**_constants, **_extra})
+                _rename[_caller][index] = _clones[_key][0]
+                _drop[_caller].update(_params[x] for x in _extra)
+
+        # Atualiza as chamadas
+        for _name in functions:
+            _code = list(functions[_name])
+            for index, _clone in _rename[_name].items():
+                _code[index] = (_code[index][0], _clone) + _code[index][2:]
+            functions[_name] = [x for index, x in enumerate(_code) if index not in _drop[_name]]
+
+        # Cria as cópias especializadas, cada uma logo após a original
+        _specialized = {}
+        for _key, (_clone, _constants) in _clones.items():
+            _code = self.bind_constant_arguments(functions[_key[0]], _constants)
+            _specialized.setdefault(_key[0], []).append((_clone, _code))
+        for _name, _constants in _bind.items():
+            functions[_name] = self.bind_constant_arguments(functions[_name], _constants)
+
+        _result = {}
+        for _name in list(functions):
+            _code = functions.pop(_name)
+            functions[_name] = _code
+            for _clone, _code in _specialized.get(_name, []):
+                _define = _code[0]
+                functions[_clone] = [(_define[0], _clone, _define[2])] + _code[1:]
+                _result[_clone] = _name
+        return _result
+
+    def bind_constant_arguments(self, code, constants):
+        """
+        Troca os argumentos de uma função pelos literais dados (posição do
+        argumento -> instrução literal), que são criados logo após a label
+        de entrada. Os argumentos trocados saem da definição da função.
+        """
+        self.enumerated_code = code
+        self.count_temps()
+        _define = code[0]
+        _regs = {}
+        _literals = []
+        for _position, _literal in constants.items():
+            _regs[_define[2][_position][1]] = self.new_temp()
+            _literals.append((_literal[0], _literal[1], _regs[_define[2][_position][1]]))
+
+        _args = [x for index, x in enumerate(_define[2]) if index not in constants]
+        _code = [(_define[0], _define[1], _args)]
+        for inst in code[1:]:
+            for _field in self.get_use_fields(inst):
+                if inst[_field] in _regs:
+                    inst = self.modify_inst_field(inst, _field, _regs[inst[_field]])
+            _code.append(inst)
+            if _literals and self.is_label(inst):
+                _code += _literals
+                _literals = []
+        return _code
+
+    def get_call_params(self, instructions, index):
+        """
+        Recupera os índices dos param de uma chamada: os que aparecem antes
+        dela no mesmo bloco, desde a chamada anterior.
+        """
+        _params = []
+        index -= 1
+        while index >= 0:
+            inst = instructions[index]
+            if inst[0].startswith("call_") or self.is_label(inst) or self.is_terminator(inst):
+                break
+            if inst[0].startswith("param_"):
+                _params.insert(0, index)
+            index -= 1
+        return _params
+
+    def can_inline(self, fname):
+        """
+        Verifica se as chamadas de uma função podem ser expandidas: a função
+        já foi processada, tem um único return, não aloca vetores e é
+        pequena (até inline_threshold instruções, ou o dobro se é chamada
+        em um único lugar).
+        """
+        if fname not in self.inline_code:
+            return False
+        _code = self.inline_code[fname]
+        if len([x for x in _code if x[0].startswith("return_")]) != 1:
+            return False
+        if any(x[0].startswith("alloc_") and len(x[0].split("_")) > 2 for x in _code):
+            return False
+        _limit = self.inline_threshold
+        if self.call_counts.get(fname, 0) == 1:
+            _limit *= 2
+        return len(_code) <= _limit
+
+    def inline_calls(self):
+        """
+        Expande as chamadas de funções pequenas no código enumerado. Os
+        registradores e labels da função chamada ganham novos nomes, os
+        parâmetros passam a ser os registradores dos argumentos e o return
+        vira a definição do registrador da chamada seguida de um salto para
+        o código depois da chamada. A função chamada é copiada antes de ser
+        otimizada, então suas variáveis locais são promovidas junto com as
+        de quem a chama.
+        """
+        self.count_temps()
+        _code = []
+        for inst in self.enumerated_code:
+            if not inst[0].startswith("call_") or not self.can_inline(inst[1]):
+                _code.append(inst)
+                continue
+
+            _callee = self.inline_code[inst[1]]
+            _args = [x[1] for x in _callee[0][2]]
+            _params = self.get_call_params(_code, len(_code))
+            if len(_params) != len(_args):
+                _code.append(inst)
+                continue
+            _regs = {_args[x]: _code[_params[x]][1] for x in range(len(_args))}
+            for index in reversed(_params):
+                del _code[index]
+
+            # Novos nomes para as labels e para os registradores
+            _labels = {}
+            for _inst in _callee:
+                if self.is_label(_inst):
+                    _labels["%" + _inst[0][:-1]] = "%" + self.new_label(_inst[0][:-1].split(".opt.")[0])
+            _return = [x for x in _callee if x[0].startswith("return_")][0]
+            _defined = [
+                x for x in _callee
+                if self.get_def_field(x) is not None and x[self.get_def_field(x)] == _return[-1]
+            ]
+            if len(_return) > 1 and len(_defined) == 1 and _return[1] not in _regs:
+                _regs[_return[1]] = inst[2]
+            _continue = _return is not _callee[-1]
+            _label = self.new_label(inst[1][1:] + ".return")
+
+            for _inst in _callee[1:]:
+                if self.is_label(_inst):
+                    _code.append((_labels["%" + _inst[0][:-1]][1:] + ":",))
+                elif _inst[0] == "jump":
+                    _code.append(("jump", _labels[_inst[1]]))
+                elif _inst[0] == "cbranch":
+                    _cond = _regs.setdefault(_inst[1], self.new_temp())
+                    _code.append(("cbranch", _cond, _labels[_inst[2]], _labels[_inst[3]]))
+                elif _inst is _return:
+                    if len(_inst) > 1 and _regs[_inst[1]] != inst[2]:
+                        _code.append(("load_" + _inst[0][7:], _regs[_inst[1]], inst[2]))
+                    if _continue:
+                        _code.append(("jump", "%" + _label))
+                else:
+                    _fields = self.get_use_fields(_inst)
+                    if self.get_def_field(_inst) is not None:
+                        _fields = _fields + [self.get_def_field(_inst)]
+                    for _field in _fields:
+                        if isinstance(_inst[_field], str) and _inst[_field][:1] == "%":
+                            if _inst[_field] not in _regs:
+                                _regs[_inst[_field]] = self.new_temp()
+                            _inst = self.modify_inst_field(_inst, _field, _regs[_inst[_field]])
+                    _code.append(_inst)
+            if _continue:
+                _code.append((_label + ":",))
+
+        self.enumerated_code = _code
+
+    def promote_global_scalars(self):
+        """
+        Promove as variáveis globais escalares para variáveis locais, que
+        depois viram valores SSA, nas regiões sem chamadas: a função
+        inteira, quando ela não faz chamadas, ou senão os laços mais
+        externos sem chamadas. A cópia local é carregada na entrada da
+        região e, só se a região escreve na global, gravada de volta nas
+        saídas da região: antes dos retornos e no início dos blocos para
+        onde o laço sai. Laços com saídas para blocos alcançados também de
+        fora do laço não são promovidos.
+        """
+        cfg = self.build_cfg()
+        _entry = cfg.next_block
+        _blocks = []
+        _block = _entry
+        while _block is not None:
+            _blocks.append(_block)
+            _block = _block.next_block
+
+        def has_call(blocks):
+            return any(inst[0].startswith("call_") for x in blocks for inst in x.instructions)
+
+        # Regiões: blocos, bloco onde as cópias são carregadas e blocos de saída
+        _regions = []
+        if not has_call(_blocks):
+            _regions.append((set(_blocks), None, []))
+        else:
+            self.compute_dominators(cfg)
+            _covered = set()
+            for _header, _body in reversed(self.find_natural_loops(cfg)):
+                if _body & _covered or has_call(_body):
+                    continue
+                _exits = [y for x in _body for y in self.get_block_sucessors(x) if y not in _body]
+                if any(z not in _body for y in _exits for z in y.predecessors):
+                    continue
+                _covered |= _body
+                _regions.append((_body, _header, list(dict.fromkeys(_exits))))
+
+        _allocs = []
+        for _body, _header, _exits in _regions:
+            # Recupera as globais escalares da região e quais delas são escritas
+            _globals = {}
+            _stored = set()
+            for _block in _body:
+                for inst in _block.instructions:
+                    if inst[0].startswith("define_"):
+                        continue
+                    _op = inst[0].split("_")
+                    for _field in range(1, len(inst)):
+                        if not isinstance(inst[_field], str) or not inst[_field].startswith("@"):
+                            continue
+                        _global = inst[_field]
+                        if len(_op) == 2 and (_op[0] == "load" and _field == 1 or _op[0] == "store" and _field == 2):
+                            if _globals.get(_global, _op[1]) == _op[1]:
+                                _globals[_global] = _op[1]
+                            else:
+                                _globals[_global] = None
+                            if _op[0] == "store":
+                                _stored.add(_global)
+                        else:
+                            _globals[_global] = None
+            _globals = {x: y for x, y in _globals.items() if y in ("int", "float", "char")}
+            if not _globals:
+                continue
+
+            _regs = {x: self.new_temp() for x in _globals}
+            for _global, _type in _globals.items():
+                _allocs.append(("alloc_" + _type, _regs[_global]))
+
+            def write_back():
+                _instructions = []
+                for _global, _type in _globals.items():
+                    if _global in _stored:
+                        _temp = self.new_temp()
+                        _instructions.append(("load_" + _type, _regs[_global], _temp))
+                        _instructions.append(("store_" + _type, _temp, _global))
+                return _instructions
+
+            # Troca os acessos à global pelos acessos à cópia local
+            for _block in _body:
+                _instructions = []
+                for inst in _block.instructions:
+                    _op = inst[0].split("_")[0]
+                    if _op == "load" and inst[1] in _regs:
+                        inst = (inst[0], _regs[inst[1]], inst[2])
+                    elif _op == "store" and inst[2] in _regs:
+                        inst = (inst[0], inst[1], _regs[inst[2]])
+                    elif _op == "return":
+                        _instructions += write_back()
+                    _instructions.append(inst)
+                _block.instructions = _instructions
+
+            # Carrega as cópias na entrada da função ou no pré-cabeçalho
+            _loads = []
+            for _global, _type in _globals.items():
+                _temp = self.new_temp()
+                _loads.append(("load_" + _type, _global, _temp))
+                _loads.append(("store_" + _type, _temp, _regs[_global]))
+            if _header is None:
+                _entry.instructions[1:1] = _loads
+            else:
+                _preheader = self.insert_preheader(cfg, _header, _body)
+                _position = len(_preheader.instructions)
+                if self.is_terminator(_preheader.instructions[-1]):
+                    _position -= 1
+                _preheader.instructions[_position:_position] = _loads
+
+            # Grava de volta as globais escritas nas saídas do laço
+            for _exit in _exits:
+                _exit.instructions[1:1] = write_back()
+
+        if not _allocs:
+            return
+        _entry.instructions[1:1] = _allocs
+        self.rebuild_code(cfg)
 
     def buildRD_blocks(self, cfg):
         """
@@ -416,7 +1047,7 @@ class DataFlow(NodeVisitor):
 
             # Recupera o nome da variável definida
             _varName = None
-            if inst[0].startswith("store_"):
+            if inst is not None and inst[0].startswith("store_"):
                 _varName = inst[2]
 
             # Adiciona a definição à lista de definições
@@ -429,7 +1060,7 @@ class DataFlow(NodeVisitor):
             inst = self.enumerated_code[index]
 
             # Recupera o nome da variável definida
-            if inst[0].startswith("store_"):
+            if inst is not None and inst[0].startswith("store_"):
                 self.rd_gen[index] = [index]
 
         # Gera o conjunto kill
@@ -439,7 +1070,7 @@ class DataFlow(NodeVisitor):
 
             # Recupera o nome da variável definida
             _defs = None
-            if inst[0].startswith("store_"):
+            if inst is not None and inst[0].startswith("store_"):
                 _defs = self.get_definitions(inst[2])
 
             # Gera o conjunto kill
@@ -508,120 +1139,139 @@ class DataFlow(NodeVisitor):
         elif not self.enumerated_code[0][0].startswith("define_void"):
             _params_regs.append("%1")
 
-        # Itera sobre as instruções do bloco
-        currentIndex = 0
-        endIteration = False
-        while not endIteration:
-            for index in range(currentIndex, len(self.enumerated_code)):
-                _store_to_remove: int = None
-                _load_to_remove: int = None
-                _store_reg: int = None
-                _load_reg: int = None
-                _varName: str = None
-
-                # Acha um load
-                inst = self.enumerated_code[index]
-                if self.enumerated_code[index][0].startswith("load_"):
-                    # Recupera a variável do load (%a)
-                    _varName = inst[1]
-
-                    # Se for uma variável global, vai pra próxima instrução
-                    if _varName.startswith("@"):
-                        continue
+        # Itera sobre as instruções do bloco. Os índices são estáveis
+        # (remoções deixam lápides), então as análises continuam válidas
+        for index in range(len(self.enumerated_code)):
+            _store_to_remove: int = None
+            _load_to_remove: int = None
+            _store_reg: int = None
+            _load_reg: int = None
+            _varName: str = None
+
+            # Acha um load de variável escalar. Loads e stores com
+            # modificadores (vetores e ponteiros) acessam a memória
+            # apontada, e não o próprio registrador
+            inst = self.enumerated_code[index]
+            if inst is None or not inst[0].startswith("load_") or len(inst[0].split("_")) > 2:
+                continue
 
-                    # Conta quantas definições da variável chegam no load
-                    _live_definitions = self.count_live_definitions(_varName, index)
+            # Recupera a variável do load (%a)
+            _varName = inst[1]
 
-                    # Se a contagem for maior de 1, então não é possível propagar a constante
-                    if _live_definitions > 1:
-                        continue
+            # Se for uma variável global, vai pra próxima instrução
+            if _varName.startswith("@"):
+                continue
 
-                    # Olha o que tem em cada in (store)
-                    _in = self.rd_in[index]
-                    for _in_index in range(len(_in)):
-                        # Vê qual dos store que tem a variável que o load carrega
-                        _store_index = _in[_in_index]
-                        _store_varName = self.enumerated_code[_store_index][2]
-
-                        # Se o store ocorrer antes do load
-                        # e se a variável do store for a mesma do load
-                        if _store_index < index and _varName == _store_varName:
-                            _store_to_remove = _store_index
-
-                    # Se achou um store
-                    if _store_to_remove is not None:
-                        # Recupera o registrador do load (%5)
-                        _load_reg = inst[2]
-
-                        # Recupera o registrador do store (%2)
-                        _store_reg = self.enumerated_code[_store_to_remove][1]
-                        _store_reg_2 = self.enumerated_code[_store_to_remove][2]
-
-                        # Se o registrador do store for um parâmetro, não remove
-                        if _store_reg in _params_regs or _store_reg_2 in _params_regs:
-                            continue
+            # Conta quantas definições da variável chegam no load
+            _live_definitions = self.count_live_definitions(_varName, index)
+
+            # Se a contagem for maior de 1, então não é possível propagar a constante
+            if _live_definitions > 1:
+                continue
 
-                        # Recupera o index do load
-                        _load_to_remove = index
+            # Olha o que tem em cada in (store)
+            for _store_index in self.get_rd_in(index):
+                # Vê qual dos store que tem a variável que o load carrega
+                _store = self.enumerated_code[_store_index]
+                if _store is None:
+                    continue
 
-                        # Substitui todos os registradores subsequentes pelo registrador do store
-                        self.cp_replace_subsequent_registers(index, _load_reg, _store_reg)
-                        
-                        # Itera pelo restante do código para achar outros loads do mesmo store
-                        canRemoveStore = self.cp_remove_similar_loads(index+1, _varName, _store_reg)
+                # Se o store ocorrer antes do load
+                # e se a variável do store for a mesma do load
+                if _store_index < index and _varName == _store[2] and len(_store[0].split("_")) == 2:
+                    _store_to_remove = _store_index
 
-                        # Remove o load e o store do código
-                        inst_to_remove = [_load_to_remove]
-                        if canRemoveStore:
-                            inst_to_remove.append(_store_to_remove)
+            # Se achou um store
+            if _store_to_remove is not None:
+                # Recupera o registrador do load (%5)
+                _load_reg = inst[2]
 
-                        self.remove_instructions(inst_to_remove)
-                        currentIndex = _store_to_remove
-                        break
+                # Recupera o registrador do store (%2)
+                _store_reg = self.enumerated_code[_store_to_remove][1]
+                _store_reg_2 = self.enumerated_code[_store_to_remove][2]
 
+                # Se o registrador do store for um parâmetro, não remove
+                if _store_reg in _params_regs or _store_reg_2 in _params_regs:
                     continue
 
-                if index == len(self.enumerated_code) - 1:
-                    endIteration = True
-                    break
+                # Recupera o index do load
+                _load_to_remove = index
 
-            self.computeRD_gen_kill()
-            self.computeRD_in_out()
+                # Substitui todos os registradores subsequentes pelo registrador do store
+                self.cp_replace_subsequent_registers(index, _load_reg, _store_reg)
+
+                # Itera pelo restante do código para achar outros loads do mesmo store
+                canRemoveStore = self.cp_remove_similar_loads(index+1, _varName, _store_reg)
+
+                # Remove o load e o store do código
+                inst_to_remove = [_load_to_remove]
+                if canRemoveStore:
+                    inst_to_remove.append(_store_to_remove)
+
+                self.remove_instructions(inst_to_remove)
 
     def remove_instructions(self, instructions_to_remove):
         """
-        Remove as instruções do código.
+        Remove as instruções do código, deixando uma lápide (None) no lugar
+        de cada uma. Os índices das demais instruções não mudam.
         """
-        sorted = instructions_to_remove.copy()
-        sorted.sort(reverse=True)
-        for index in range(len(sorted)):
-            inst_index = sorted[index]
+        for inst_index in instructions_to_remove:
+            if self.enumerated_code[inst_index] is None:
+                continue
+            self.remove_def_use(inst_index)
             self.enumerated_code[inst_index] = None
+
+    def get_live_code(self):
+        """
+        Recupera as instruções do código enumerado, sem as lápides.
+        """
+        return [x for x in self.enumerated_code if x is not None]
+
+    def compact_instructions(self):
+        """
+        Descarta as lápides deixadas pelas remoções. Invalida os índices,
+        então só é chamada por optimize_function: antes do peephole, que
+        reescreve sequências de instruções vizinhas, e ao final. As
+        passagens que só removem instruções deixam as lápides no lugar.
+        """
         self.enumerated_code = [x for x in self.enumerated_code if x is not None]
-        
+        self.build_def_use()
+
     def cp_replace_subsequent_registers(self, starting_index, _load_reg, _reg):
         """
-        Realiza a otimização de propagação de constantes.
+        Substitui os usos subsequentes de um registrador, visitando apenas
+        as instruções da sua cadeia def-uso.
         """
-        # Itera pelo restante do código
-        for inst_idx in range(starting_index, len(self.enumerated_code)):
+        # Itera pelos usos do registrador do load (%5)
+        for inst_idx in self.get_uses(_load_reg):
+            if inst_idx < starting_index:
+                continue
             inst = self.enumerated_code[inst_idx]
 
-            # Substitui todas as ocorrências registradores do load (%5)
+            # Substitui os usos do registrador do load (%5)
             # pelo registrador do store (%2)
-            for field_index in range(len(inst)):
+            for field_index in self.get_use_fields(inst):
                 if inst[field_index] == _load_reg:
-                    new_inst = self.modify_inst_field(self.enumerated_code[inst_idx], field_index, _reg)
-                    self.enumerated_code[inst_idx] = new_inst
-    
+                    inst = self.modify_inst_field(inst, field_index, _reg)
+            self.enumerated_code[inst_idx] = inst
+
+            # Atualiza as cadeias def-uso
+            self.du_uses[_load_reg].remove(inst_idx)
+            if _reg not in self.du_uses:
+                self.du_uses[_reg] = []
+            self.du_uses[_reg].append(inst_idx)
+
     def cp_remove_similar_loads(self, starting_index, varName, _reg) -> bool:
         """
         Remove loads que carregam a mesma variável.
         """
         _loads_to_remove = []
         canRemoveStore = True
-        # Itera sobre as instruções do bloco
-        for inst_idx in range(starting_index, len(self.enumerated_code)):
+
+        # Itera apenas pelos usos e definições da variável
+        _chain = self.get_uses(varName) + self.get_defs(varName)
+        _chain = sorted(x for x in _chain if x >= starting_index)
+        for inst_idx in _chain:
             inst = self.enumerated_code[inst_idx]
 
             # Se achar um load da mesma variável, marca-o para remoção
@@ -667,13 +1317,31 @@ class DataFlow(NodeVisitor):
         """
         Calcula os conjuntos use e def para análise de variáveis vivas.
         """
+        # Variáveis globais escritas na função. Elas seguem vivas nas
+        # chamadas, que podem lê-las, e no retorno da função
+        _globals = []
+        for inst in self.enumerated_code:
+            if inst is not None and inst[0].startswith("store_") and str(inst[2]).startswith("@"):
+                if inst[2] not in _globals:
+                    _globals.append(inst[2])
+
         # Itera de baixo para cima
         for index in range(len(self.enumerated_code) - 1, -1, -1):
             # Recupera a instrução
             inst = self.enumerated_code[index]
 
-            # Caso definição: adiciona ao conjunto def
-            if inst[0].startswith("store_"):
+            # Ignora instruções removidas
+            if inst is None:
+                continue
+
+            # Caso chamada ou retorno: usa as variáveis globais
+            if inst[0].startswith(("call_", "return_")):
+                self.lv_use[index] = _globals.copy()
+
+            # Caso definição: adiciona ao conjunto def. Stores por
+            # referência (store_<tipo>_*) escrevem na memória apontada,
+            # não definem o registrador do endereço
+            if inst[0].startswith("store_") and self.get_def_field(inst) is not None:
                 _varName = inst[2]
                 self.lv_def[index] = [_varName]
 
@@ -746,25 +1414,2369 @@ class DataFlow(NodeVisitor):
         
         # Remove as instruções mortas
         self.remove_instructions(_inst_to_remove)
+        return len(_inst_to_remove) > 0
+
+    def remove_dead_instructions(self):
+        """
+        Eliminação de código morto por marcação e varredura. Instruções com
+        efeitos colaterais são vivas; as definições dos registradores que
+        uma instrução viva usa também são. As instruções que apenas
+        calculam valores e não foram marcadas são removidas, inclusive
+        ciclos de valores que só alimentam a si mesmos.
+        """
+        _live = set()
+        _worklist = []
+        for index in range(len(self.enumerated_code)):
+            inst = self.enumerated_code[index]
+            if inst is not None and not self.is_removable(inst):
+                _live.add(index)
+                _worklist.append(index)
 
+        while _worklist:
+            inst = self.enumerated_code[_worklist.pop()]
+            for _field in self.get_use_fields(inst):
+                for _def in self.get_defs(inst[_field]):
+                    if _def not in _live:
+                        _live.add(_def)
+                        _worklist.append(_def)
 
-    def short_circuit_jumps(self, cfg):
+        _dead = [x for x in range(len(self.enumerated_code)) if self.enumerated_code[x] is not None and x not in _live]
+        self.remove_instructions(_dead)
+        return len(_dead) > 0
+
+
+    def new_temp(self) -> str:
         """
-        Simplifica os saltos no fluxo de controle.
+        Cria um novo temporário, sem conflito com os já usados na função.
         """
-        pass
+        self.temp_count += 1
+        return "%" + str(self.temp_count)
 
-    def merge_blocks(self, cfg):
+    def new_label(self, label: str) -> str:
         """
-        Mescla blocos no fluxo de controle.
+        Cria uma nova label, sem conflito com as já usadas na função.
         """
-        pass
+        self.label_count += 1
+        return label + ".opt." + str(self.label_count)
 
-    def discard_unused_allocs(self, cfg):
+    def count_temps(self):
         """
-        Descarta alocações de memória não utilizadas.
+        Recupera o maior temporário numérico e o maior número de label
+        criada pelas otimizações usados na função.
         """
-        pass
+        self.temp_count = 0
+        self.label_count = 0
+        for inst in self.enumerated_code:
+            if inst is None:
+                continue
+            if self.is_label(inst) and ".opt." in inst[0]:
+                _number = inst[0][:-1].split(".opt.")[-1]
+                if _number.isdigit():
+                    self.label_count = max(self.label_count, int(_number))
+            for _field in inst[1:]:
+                _regs = [x[1] for x in _field] if isinstance(_field, list) else [_field]
+                for _reg in _regs:
+                    if isinstance(_reg, str) and _reg[:1] == "%" and _reg[1:].isdigit():
+                        self.temp_count = max(self.temp_count, int(_reg[1:]))
+
+    def is_label(self, inst):
+        """
+        Verifica se a instrução é uma label.
+        """
+        return inst is not None and len(inst) == 1 and inst[0].endswith(":")
+
+    def is_terminator(self, inst):
+        """
+        Verifica se a instrução encerra um bloco básico.
+        """
+        return inst is not None and inst[0].split("_")[0] in ("jump", "cbranch", "return")
+
+    def build_cfg(self):
+        """
+        Constrói o grafo de fluxo de controle a partir do código enumerado.
+        O primeiro bloco (sem label) contém apenas a definição da função.
+        Instruções após um salto e antes da próxima label são inalcançáveis
+        e não entram no grafo.
+        """
+        # Separa as instruções em grupos, um por label. O primeiro grupo
+        # guarda a definição da função
+        _groups = [(None, [])]
+        _dead = False
+        for inst in self.enumerated_code:
+            if inst is None:
+                continue
+            if self.is_label(inst):
+                _groups.append((inst[0][:-1], [inst]))
+                _dead = False
+            elif not _dead:
+                _groups[-1][1].append(inst)
+                _dead = self.is_terminator(inst)
+
+        # Cria os blocos
+        cfg = BasicBlock(None)
+        cfg.instructions = _groups[0][1]
+        _blocks = [cfg]
+        _labels = {}
+        for _label, _instructions in _groups[1:]:
+            if _instructions[-1][0] == "cbranch":
+                _block = ConditionBlock(_label)
+            else:
+                _block = BasicBlock(_label)
+            _block.instructions = _instructions
+            _labels[_label] = _block
+            _blocks[-1].next_block = _block
+            _blocks.append(_block)
+
+        # Conecta os blocos
+        for index in range(len(_blocks)):
+            _block = _blocks[index]
+            inst = _block.instructions[-1]
+            if inst[0] == "jump":
+                _block.branch = _labels[inst[1][1:]]
+            elif inst[0] == "cbranch":
+                _block.taken = _labels[inst[2][1:]]
+                _block.fall_through = _labels[inst[3][1:]]
+            elif not inst[0].startswith("return") and index + 1 < len(_blocks):
+                _block.branch = _blocks[index + 1]
+
+            for _sucessor in self.get_block_sucessors(_block):
+                _sucessor.predecessors.append(_block)
+
+        return cfg
+
+    def remove_unreachable_blocks(self):
+        """
+        Remove os blocos inalcançáveis a partir da entrada da função, junto
+        com suas labels, e os retira das listas de predecessores. Na forma
+        SSA, os argumentos dos phis vindos desses blocos também são removidos.
+        """
+        cfg = self.build_cfg()
+        _reachable = {cfg}
+        _stack = [cfg]
+        while _stack:
+            for _sucessor in self.get_block_sucessors(_stack.pop()):
+                if _sucessor not in _reachable:
+                    _reachable.add(_sucessor)
+                    _stack.append(_sucessor)
+
+        _dead = set()
+        _block = cfg
+        while _block.next_block is not None:
+            if _block.next_block not in _reachable:
+                _dead.add("%" + _block.next_block.label)
+                _block.next_block = _block.next_block.next_block
+            else:
+                _block = _block.next_block
+        if not _dead:
+            return False
+
+        _block = cfg
+        while _block is not None:
+            _block.predecessors = [x for x in _block.predecessors if x in _reachable]
+            for index in range(len(_block.instructions)):
+                inst = _block.instructions[index]
+                if inst[0].startswith("phi_"):
+                    _phi = [inst[0]]
+                    for _field in range(1, len(inst) - 1, 2):
+                        if inst[_field + 1] not in _dead:
+                            _phi += [inst[_field], inst[_field + 1]]
+                    _block.instructions[index] = tuple(_phi + [inst[-1]])
+            _block = _block.next_block
+
+        self.rebuild_code(cfg)
+        return True
+
+    def get_block_sucessors(self, block):
+        """
+        Recupera os blocos sucessores de um bloco.
+        """
+        if isinstance(block, ConditionBlock):
+            if block.taken is block.fall_through:
+                return [block.taken]
+            return [block.taken, block.fall_through]
+        if block.branch is not None:
+            return [block.branch]
+        return []
+
+    def rebuild_code(self, cfg):
+        """
+        Refaz o código enumerado a partir do grafo de fluxo de controle.
+        Usada ao final das passagens que reestruturam o grafo (as da forma
+        SSA e as de simplificação do CFG), que trabalham sobre os blocos e
+        não sobre os índices. Invalida os índices, então as análises
+        precisam ser refeitas.
+        """
+        self.enumerated_code = []
+        self.enumerate_instructions(cfg)
+        self.build_def_use()
+
+    def compute_dominators(self, cfg):
+        """
+        Calcula a árvore de dominadores dos blocos alcançáveis
+        (algoritmo iterativo de Cooper, Harvey e Kennedy).
+        """
+        # Ordena os blocos em pós-ordem reversa
+        _postorder = []
+        _visited = {cfg}
+        _stack = [(cfg, iter(self.get_block_sucessors(cfg)))]
+        while _stack:
+            _block, _sucessors = _stack[-1]
+            _next = next(_sucessors, None)
+            if _next is None:
+                _postorder.append(_block)
+                _stack.pop()
+            elif _next not in _visited:
+                _visited.add(_next)
+                _stack.append((_next, iter(self.get_block_sucessors(_next))))
+        self.rpo = _postorder[::-1]
+        _order = {_block: index for index, _block in enumerate(self.rpo)}
+
+        def intersect(a, b):
+            while a is not b:
+                while _order[a] > _order[b]:
+                    a = self.idom[a]
+                while _order[b] > _order[a]:
+                    b = self.idom[b]
+            return a
+
+        # Itera até que os dominadores imediatos não mudem
+        self.idom = {cfg: cfg}
+        _changed = True
+        while _changed:
+            _changed = False
+            for _block in self.rpo[1:]:
+                _new_idom = None
+                for _pred in _block.predecessors:
+                    if _pred in self.idom:
+                        _new_idom = _pred if _new_idom is None else intersect(_pred, _new_idom)
+                if self.idom.get(_block) is not _new_idom:
+                    self.idom[_block] = _new_idom
+                    _changed = True
+
+        # Monta os filhos de cada bloco na árvore de dominadores
+        self.dom_children = {_block: [] for _block in self.rpo}
+        for _block in self.rpo[1:]:
+            self.dom_children[self.idom[_block]].append(_block)
+
+    def dominates(self, a, b):
+        """
+        Verifica se o bloco a domina o bloco b.
+        """
+        while b is not a:
+            if self.idom[b] is b:
+                return False
+            b = self.idom[b]
+        return True
+
+    def compute_dominance_frontiers(self):
+        """
+        Calcula as fronteiras de dominância dos blocos alcançáveis.
+        """
+        self.dom_frontier = {_block: set() for _block in self.rpo}
+        for _block in self.rpo:
+            _preds = [x for x in _block.predecessors if x in self.idom]
+            if len(_preds) < 2:
+                continue
+            for _pred in _preds:
+                _runner = _pred
+                while _runner is not self.idom[_block]:
+                    self.dom_frontier[_runner].add(_block)
+                    _runner = self.idom[_runner]
+
+    def get_ssa_candidates(self, cfg):
+        """
+        Recupera as variáveis escalares locais (alloc_int/float/char) que
+        são acessadas apenas por load e store e podem virar valores SSA.
+        """
+        _candidates = {}
+        _block = cfg
+        while _block is not None:
+            for inst in _block.instructions:
+                _op = inst[0].split("_")
+                if _op[0] == "alloc" and len(_op) == 2 and _op[1] in ("int", "float", "char"):
+                    _candidates[inst[1]] = _op[1]
+            _block = _block.next_block
+
+        # Descarta variáveis usadas de outra forma ou em blocos inalcançáveis
+        _block = cfg
+        while _block is not None:
+            for inst in _block.instructions:
+                _op = inst[0].split("_")
+                _allowed = []
+                if _block in self.idom:
+                    if _op[0] == "alloc" or _op[0] == "store" and len(_op) == 2:
+                        _allowed = [len(inst) - 1]
+                    elif _op[0] == "load" and len(_op) == 2:
+                        _allowed = [1]
+                for _field in range(1, len(inst)):
+                    if isinstance(inst[_field], str) and inst[_field] in _candidates and _field not in _allowed:
+                        del _candidates[inst[_field]]
+            _block = _block.next_block
+
+        return _candidates
+
+    def compute_ssa_liveness(self, candidates):
+        """
+        Calcula as variáveis candidatas vivas na entrada de cada bloco,
+        usadas para inserir apenas as funções phi necessárias (SSA podada).
+        """
+        _use = {}
+        _def = {}
+        for _block in self.rpo:
+            _use[_block] = set()
+            _def[_block] = set()
+            for inst in _block.instructions:
+                if inst[0].startswith("load_") and inst[1] in candidates:
+                    if inst[1] not in _def[_block]:
+                        _use[_block].add(inst[1])
+                elif inst[0].split("_")[0] in ("store", "alloc") and inst[-1] in candidates:
+                    _def[_block].add(inst[-1])
+
+        _live_in = {_block: set() for _block in self.rpo}
+        _changed = True
+        while _changed:
+            _changed = False
+            for _block in reversed(self.rpo):
+                _out = set()
+                for _sucessor in self.get_block_sucessors(_block):
+                    _out |= _live_in[_sucessor]
+                _in = _use[_block] | (_out - _def[_block])
+                if _in != _live_in[_block]:
+                    _live_in[_block] = _in
+                    _changed = True
+        return _def, _live_in
+
+    def construct_ssa(self):
+        """
+        Constrói a forma SSA: promove as variáveis escalares locais para
+        valores SSA, inserindo funções phi na fronteira de dominância e
+        renomeando loads e stores pelos valores correntes das variáveis.
+        A phi é representada como (phi_<tipo>, v1, %bloco1, v2, %bloco2, ..., destino).
+        """
+        cfg = self.build_cfg()
+        self.compute_dominators(cfg)
+        self.compute_dominance_frontiers()
+
+        _candidates = self.get_ssa_candidates(cfg)
+        if not _candidates:
+            return
+        _defs, _live_in = self.compute_ssa_liveness(_candidates)
+
+        # Insere as funções phi (sem argumentos por enquanto)
+        _phis = {_block: [] for _block in self.rpo}
+        for _varName in _candidates:
+            _worklist = [x for x in self.rpo if _varName in _defs[x]]
+            _has_phi = set()
+            while _worklist:
+                _block = _worklist.pop()
+                for _frontier in self.dom_frontier[_block]:
+                    if _frontier in _has_phi or _varName not in _live_in[_frontier]:
+                        continue
+                    _has_phi.add(_frontier)
+                    _phis[_frontier].append([_varName, self.new_temp(), {}])
+                    if _varName not in _defs[_frontier]:
+                        _worklist.append(_frontier)
+
+        # Renomeia percorrendo a árvore de dominadores
+        _replace = {}
+        _stacks = {_varName: [] for _varName in _candidates}
+        _zero = None
+
+        def current_value(varName):
+            nonlocal _zero
+            if _stacks[varName]:
+                return _stacks[varName][-1]
+            # Variável lida sem definição: o alloc inicializa com zero
+            if _zero is None:
+                _zero = self.new_temp()
+            return _zero
+
+        _walk = [(cfg, None)]
+        while _walk:
+            _block, _pushed = _walk.pop()
+            if _pushed is not None:
+                for _varName in _pushed:
+                    _stacks[_varName].pop()
+                continue
+
+            _pushed = []
+            for _phi in _phis[_block]:
+                _stacks[_phi[0]].append(_phi[1])
+                _pushed.append(_phi[0])
+
+            _instructions = []
+            for inst in _block.instructions:
+                _op = inst[0].split("_")[0]
+                if _op == "load" and inst[1] in _candidates:
+                    _replace[inst[2]] = current_value(inst[1])
+                    continue
+                if _op == "store" and inst[2] in _candidates:
+                    _stacks[inst[2]].append(inst[1])
+                    _pushed.append(inst[2])
+                    continue
+                if _op == "alloc" and inst[1] in _candidates:
+                    _zero_reg = self.new_temp()
+                    _stacks[inst[1]].append(_zero_reg)
+                    _pushed.append(inst[1])
+                    inst = ("literal_int", 0, _zero_reg)
+                _instructions.append(inst)
+            _block.instructions = _instructions
+
+            for _sucessor in self.get_block_sucessors(_block):
+                for _phi in _phis[_sucessor]:
+                    _phi[2][_block] = current_value(_phi[0])
+
+            _walk.append((_block, _pushed))
+            for _child in reversed(self.dom_children[_block]):
+                _walk.append((_child, None))
+
+        # O zero fica logo após a label de entrada, que domina todos os usos
+        if _zero is not None:
+            cfg.next_block.instructions.insert(1, ("literal_int", 0, _zero))
+
+        def find(reg):
+            while reg in _replace:
+                reg = _replace[reg]
+            return reg
+
+        # Insere as phi no início dos blocos e aplica as substituições
+        _block = cfg
+        while _block is not None:
+            _instructions = []
+            for inst in _block.instructions:
+                for _field in self.get_use_fields(inst):
+                    if inst[_field] in _replace:
+                        inst = self.modify_inst_field(inst, _field, find(inst[_field]))
+                _instructions.append(inst)
+            if _block in _phis and _phis[_block]:
+                _phi_insts = []
+                for _varName, _target, _args in _phis[_block]:
+                    _phi = ["phi_" + _candidates[_varName]]
+                    for _pred in _block.predecessors:
+                        if _pred in _args:
+                            _phi += [find(_args[_pred]), "%" + str(_pred.label)]
+                    _phi_insts.append(tuple(_phi + [_target]))
+                _instructions = _instructions[:1] + _phi_insts + _instructions[1:]
+            _block.instructions = _instructions
+            _block = _block.next_block
+
+        self.rebuild_code(cfg)
+        self.remove_unused_ssa_values()
+
+    def is_pure(self, inst):
+        """
+        Verifica se a instrução apenas calcula um valor, sem efeitos
+        colaterais nem possibilidade de falha (divisão por zero).
+        """
+        _op = inst[0].split("_")[0]
+        if _op in ("phi", "literal", "elem", "load"):
+            return True
+        return inst[0] in constant_folding and _op not in ("div", "mod")
+
+    def is_removable(self, inst):
+        """
+        Verifica se a instrução pode ser removida quando seu resultado não
+        é usado. Uma divisão só pode ser descartada quando o divisor é um
+        literal diferente de zero; senão ela mantém a falha para o tempo
+        de execução.
+        """
+        if self.is_pure(inst):
+            return True
+        if inst[0].split("_")[0] not in ("div", "mod"):
+            return False
+        _defs = self.get_defs(inst[2])
+        if len(_defs) != 1:
+            return False
+        _def = self.enumerated_code[_defs[0]]
+        return _def is not None and _def[0].startswith("literal_") and _def[1] != 0
+
+    def tail_recursion_elimination(self):
+        """
+        Elimina a recursão de cauda na forma SSA. Uma chamada da própria
+        função cujo resultado só é copiado até o return, sem outros efeitos
+        no caminho, vira um salto para o bloco de entrada. Os argumentos
+        passam a ser phis na entrada, que recebem os valores dos param da
+        chamada.
+        """
+        cfg = self.build_cfg()
+        _define = cfg.instructions[0]
+        _entry = cfg.branch
+        if _entry is None or not _define[0].startswith("define_"):
+            return
+        _labels = {}
+        _block = cfg
+        while _block is not None:
+            _labels["%" + str(_block.label)] = _block
+            _block = _block.next_block
+
+        def returns_value(block, index, value):
+            # Segue o valor da chamada até um return, passando por cópias
+            # e phis, sem instruções com efeitos colaterais no caminho. Só
+            # são aceitos stores que gravam numa global o valor recarregado
+            # dela após a chamada
+            _visited = set()
+            _previous = None
+            _reloads = {}
+            while block not in _visited:
+                _visited.add(block)
+                for inst in block.instructions[index:]:
+                    if inst[0].startswith("phi_"):
+                        _args = [
+                            inst[x] for x in range(1, len(inst) - 1, 2)
+                            if inst[x + 1] == "%" + str(_previous.label)
+                        ]
+                        if value in _args:
+                            value = inst[-1]
+                        if _args and _args[0] in _reloads:
+                            _reloads[inst[-1]] = _reloads[_args[0]]
+                    elif inst[0].startswith("return_"):
+                        return len(inst) == 1 or inst[1] == value
+                    elif inst[0] == "jump" or self.is_label(inst):
+                        continue
+                    elif inst[0].startswith("store_") and _reloads.get(inst[1]) == inst[2]:
+                        continue
+                    elif not self.is_pure(inst):
+                        return False
+                    elif inst[0].startswith("load_") and inst[1] == value:
+                        value = inst[-1]
+                    elif inst[0].startswith("load_") and str(inst[1]).startswith("@"):
+                        _reloads[inst[-1]] = inst[1]
+                if isinstance(block, ConditionBlock) or block.branch is None:
+                    return False
+                _previous = block
+                block = block.branch
+                index = 0
+            return False
+
+        # Encontra as chamadas de cauda
+        _tails = []
+        _block = cfg
+        while _block is not None:
+            for index in range(len(_block.instructions)):
+                inst = _block.instructions[index]
+                if not inst[0].startswith("call_") or inst[1] != _define[1]:
+                    continue
+                _params = self.get_call_params(_block.instructions, index)
+                if len(_params) == len(_define[2]) and returns_value(_block, index + 1, inst[-1]):
+                    _tails.append((_block, index, _params))
+                break
+            _block = _block.next_block
+        if not _tails:
+            return
+
+        # Os usos dos argumentos passam a usar os phis da entrada
+        _regs = {_reg: self.new_temp() for _, _reg in _define[2]}
+        _block = cfg
+        while _block is not None:
+            for index in range(len(_block.instructions)):
+                inst = _block.instructions[index]
+                for _field in self.get_use_fields(inst):
+                    if inst[_field] in _regs:
+                        inst = self.modify_inst_field(inst, _field, _regs[inst[_field]])
+                _block.instructions[index] = inst
+            _block = _block.next_block
+
+        # Troca cada chamada de cauda por um salto para a entrada
+        _phis = [["phi_" + _type, _reg, "%None"] for _type, _reg in _define[2]]
+        for _block, index, _params in _tails:
+            for _phi, _param in zip(_phis, _params):
+                _phi += [_block.instructions[_param][1], "%" + _block.label]
+            for _sucessor in self.get_block_sucessors(_block):
+                for _position in range(len(_sucessor.instructions)):
+                    _phi = _sucessor.instructions[_position]
+                    if _phi[0].startswith("phi_"):
+                        _args = []
+                        for _field in range(1, len(_phi) - 1, 2):
+                            if _phi[_field + 1] != "%" + _block.label:
+                                _args += [_phi[_field], _phi[_field + 1]]
+                        _sucessor.instructions[_position] = tuple([_phi[0]] + _args + [_phi[-1]])
+            _instructions = [_block.instructions[x] for x in range(index) if x not in _params]
+            _block.instructions = _instructions + [("jump", "%" + _entry.label)]
+        for _phi, (_, _reg) in zip(_phis, _define[2]):
+            _entry.instructions.insert(1, tuple(_phi + [_regs[_reg]]))
+
+        self.rebuild_code(cfg)
+
+    def remove_unused_ssa_values(self):
+        """
+        Remove instruções sem efeitos colaterais cujo resultado não é usado,
+        como os valores de variáveis promovidas que nunca são lidos.
+        """
+        _worklist = list(range(len(self.enumerated_code)))
+        while _worklist:
+            index = _worklist.pop()
+            inst = self.enumerated_code[index]
+            if inst is None or not self.is_pure(inst):
+                continue
+            if self.get_uses(inst[-1]):
+                continue
+            _operands = [inst[x] for x in self.get_use_fields(inst)]
+            self.remove_instructions([index])
+            for _reg in _operands:
+                _worklist += self.get_defs(_reg)
+
+    def algebraic_simplification(self):
+        """
+        Simplificações algébricas na forma SSA, usando os operandos
+        literais: identidades (x+0, x*1, x/1, ...) viram o próprio x,
+        x*0, x%1, x-x e comparações de x com ele mesmo viram literais, x*2
+        vira x+x e cadeias de somas ou multiplicações inteiras por
+        constantes são reassociadas numa só operação. Em float só são
+        feitas as identidades exatas (-0.0 e NaN impedem as demais), e a
+        divisão inteira (piso) só é simplificada por 1.
+        """
+        self.build_def_use()
+        _literals = {}
+        _defs = {}
+        for inst in self.enumerated_code:
+            if inst is None:
+                continue
+            if inst[0].startswith("literal_"):
+                _literals[inst[-1]] = inst[1]
+            _field = self.get_def_field(inst)
+            if _field is not None:
+                _defs[inst[_field]] = inst
+
+        def number(reg):
+            # Valor numérico de um registrador literal (bools não contam)
+            _value = _literals.get(reg)
+            if type(_value) in (int, float):
+                return _value
+            return None
+
+        def simplify(inst):
+            _op = inst[0].split("_")
+            if len(_op) != 2 or _op[0] not in binary_ops or len(inst) != 4:
+                return inst, None
+            _opcode, _type = _op
+            a, b, _target = inst[1], inst[2], inst[3]
+            _a, _b = number(a), number(b)
+            _exact = _type in ("int", "char")
+
+            if _type == "bool":
+                _a, _b = _literals.get(a), _literals.get(b)
+                if a == b and _opcode in ("and", "or"):
+                    return None, a
+                if a == b and _opcode in ("eq", "ne"):
+                    return ("literal_bool", _opcode == "eq", _target), None
+                for x, y, _value in ((a, b, _b), (b, a, _a)):
+                    if _value is None:
+                        continue
+                    if _opcode == "and":
+                        return (None, x) if _value else (("literal_bool", False, _target), None)
+                    if _opcode == "or":
+                        return (("literal_bool", True, _target), None) if _value else (None, x)
+                return inst, None
+
+            if _opcode == "add" and _exact:
+                if _b == 0:
+                    return None, a
+                if _a == 0:
+                    return None, b
+            if _opcode == "sub" and _b == 0 and (_exact or _type == "float"):
+                return None, a
+            if _opcode == "sub" and _exact and a == b:
+                return ("literal_" + _type, 0, _target), None
+            if _opcode == "mul":
+                if _b == 1:
+                    return None, a
+                if _a == 1:
+                    return None, b
+                if _exact and (_a == 0 or _b == 0):
+                    return ("literal_" + _type, 0, _target), None
+                if _exact and _b == 2:
+                    return ("add_" + _type, a, a, _target), None
+                if _exact and _a == 2:
+                    return ("add_" + _type, b, b, _target), None
+            if _opcode == "div" and _b == 1:
+                return None, a
+            if _opcode == "mod" and _exact and _b == 1:
+                return ("literal_" + _type, 0, _target), None
+            if _opcode in ("eq", "le", "ge", "ne", "lt", "gt") and _exact and a == b:
+                return ("literal_bool", _opcode in ("eq", "le", "ge"), _target), None
+            return inst, None
+
+        def reassociate(inst):
+            # (x op c1) op c2 -> x op (c1 op c2), se x op c1 não tem outros usos
+            if inst[0] not in ("add_int", "sub_int", "mul_int"):
+                return None
+            _inner = _defs.get(inst[1])
+            _constant = number(inst[2])
+            if _inner is None or _constant is None or len(self.get_uses(inst[1])) != 1:
+                return None
+            if inst[0] == "mul_int" and _inner[0] == "mul_int" and number(_inner[2]) is not None:
+                return _inner[1], "mul_int", number(_inner[2]) * _constant
+            if inst[0] == "mul_int" and _inner[0] == "add_int" and _inner[1] == _inner[2]:
+                return _inner[1], "mul_int", 2 * _constant
+            if inst[0] != "mul_int" and _inner[0] in ("add_int", "sub_int") and number(_inner[2]) is not None:
+                _first = number(_inner[2]) if _inner[0] == "add_int" else -number(_inner[2])
+                _second = _constant if inst[0] == "add_int" else -_constant
+                return _inner[1], "add_int", _first + _second
+            return None
+
+        _replace = {}
+
+        def find(reg):
+            while reg in _replace:
+                reg = _replace[reg]
+            return reg
+
+        _changed = False
+        _code = []
+        for inst in self.enumerated_code:
+            if inst is None:
+                continue
+            for _field in self.get_use_fields(inst):
+                inst = self.modify_inst_field(inst, _field, find(inst[_field]))
+            _new, _copy = simplify(inst)
+            if _new is inst:
+                _chain = reassociate(inst)
+                if _chain is not None:
+                    _source, _opcode, _value = _chain
+                    _temp = self.new_temp()
+                    _literals[_temp] = _value
+                    _code.append(("literal_int", _value, _temp))
+                    _new = (_opcode, _source, _temp, inst[-1])
+            if _new is not inst:
+                _changed = True
+                if _new is None:
+                    _replace[inst[-1]] = _copy
+                    continue
+                if _new[0].startswith("literal_"):
+                    _literals[_new[-1]] = _new[1]
+                _defs[_new[-1]] = _new
+            _code.append(_new)
+
+        # Os usos anteriores à simplificação (phis de laços) também mudam
+        for index in range(len(_code)):
+            inst = _code[index]
+            for _field in self.get_use_fields(inst):
+                inst = self.modify_inst_field(inst, _field, find(inst[_field]))
+            _code[index] = inst
+
+        self.enumerated_code = _code
+        self.build_def_use()
+        if _changed:
+            self.remove_unused_ssa_values()
+        return _changed
+
+    def fold_constant(self, opcode, operands):
+        """
+        Avalia uma operação da uCIR sobre constantes, com a mesma semântica
+        do interpretador. Retorna uma tupla (valor,) ou None se não for
+        possível avaliar a operação.
+        """
+        if opcode not in constant_folding:
+            return None
+        try:
+            return (constant_folding[opcode](*operands),)
+        except (ArithmeticError, TypeError, ValueError):
+            return None
+
+    def get_block_instructions(self, cfg):
+        """
+        Mapeia cada registrador para as instruções (bloco, posição) que o usam.
+        """
+        _uses = {}
+        _block = cfg
+        while _block is not None:
+            for index in range(len(_block.instructions)):
+                inst = _block.instructions[index]
+                for _field in self.get_use_fields(inst):
+                    if inst[_field] not in _uses:
+                        _uses[inst[_field]] = []
+                    _uses[inst[_field]].append((_block, index))
+            _block = _block.next_block
+        return _uses
+
+    def sparse_conditional_constant_propagation(self):
+        """
+        Propagação de constantes condicional esparsa (Wegman e Zadeck) sobre
+        a forma SSA. Avalia as operações aritméticas, relacionais e booleanas
+        sobre constantes, troca por literais os valores constantes, troca
+        cbranch com condição constante por jump e remove os blocos que nunca
+        são executados.
+        """
+        cfg = self.build_cfg()
+        _uses = self.get_block_instructions(cfg)
+
+        # Reticulado: ausente (indefinido), (valor,) (constante) ou _bottom (variável)
+        _bottom = "bottom"
+        _values = {}
+        _edges = set()
+        _executable = set()
+        _cfg_work = [(None, cfg)]
+        _ssa_work = []
+
+        def same(a, b):
+            if a is _bottom or b is _bottom:
+                return a is b
+            return type(a[0]) is type(b[0]) and a[0] == b[0]
+
+        def meet(a, b):
+            if a is None:
+                return b
+            if b is None or same(a, b):
+                return a
+            return _bottom
+
+        def lower(reg, value):
+            _old = _values.get(reg)
+            _new = meet(_old, value)
+            if _old is None and _new is not None or _old is not None and not same(_old, _new):
+                _values[reg] = _new
+                _ssa_work.extend(_uses.get(reg, []))
+
+        def add_edge(block, target):
+            if (block, target) not in _edges:
+                _cfg_work.append((block, target))
+
+        def evaluate(block, inst):
+            _op = inst[0].split("_")
+
+            if _op[0] == "phi":
+                _value = None
+                for index in range(1, len(inst) - 1, 2):
+                    _pred = _labels[inst[index + 1]]
+                    if (_pred, block) in _edges:
+                        _value = meet(_value, _values.get(inst[index]))
+                if _value is not None:
+                    lower(inst[-1], _value)
+                return
+
+            if self.is_terminator(inst) or inst[0] == "cbranch":
+                if inst[0] == "jump":
+                    add_edge(block, block.branch)
+                elif inst[0] == "cbranch":
+                    _cond = _values.get(inst[1])
+                    if _cond is None:
+                        return
+                    if _cond is _bottom or _cond[0]:
+                        add_edge(block, block.taken)
+                    if _cond is _bottom or not _cond[0]:
+                        add_edge(block, block.fall_through)
+                return
+
+            _field = self.get_def_field(inst)
+            if _field is None:
+                return
+            _target = inst[_field]
+
+            if _op[0] == "literal" and _op[1] in ("int", "float", "bool"):
+                lower(_target, (inst[1],))
+                return
+
+            _fields = self.get_use_fields(inst)
+            if inst[0] not in constant_folding or len(_fields) == 0:
+                lower(_target, _bottom)
+                return
+
+            _operands = [_values.get(inst[x]) for x in _fields]
+            if any(x is _bottom for x in _operands):
+                lower(_target, _bottom)
+            elif all(x is not None for x in _operands):
+                _result = self.fold_constant(inst[0], [x[0] for x in _operands])
+                lower(_target, _result if _result is not None else _bottom)
+
+        _labels = {}
+        _block = cfg
+        while _block is not None:
+            _labels["%" + str(_block.label)] = _block
+            _block = _block.next_block
+
+        # Parâmetros da função são desconhecidos
+        for _param in cfg.instructions[0][2]:
+            _values[_param[1]] = _bottom
+
+        while _cfg_work or _ssa_work:
+            while _cfg_work:
+                _pred, _block = _cfg_work.pop()
+                if (_pred, _block) in _edges:
+                    continue
+                _edges.add((_pred, _block))
+
+                # Na primeira visita avalia todo o bloco, depois só as phi
+                _first = _block not in _executable
+                _executable.add(_block)
+                for inst in _block.instructions:
+                    if _first or inst[0].startswith("phi_"):
+                        evaluate(_block, inst)
+
+                # Blocos sem salto seguem para o próximo bloco
+                if _first and not self.is_terminator(_block.instructions[-1]) and _block.branch is not None:
+                    add_edge(_block, _block.branch)
+
+            while _ssa_work:
+                _block, index = _ssa_work.pop()
+                if _block in _executable:
+                    evaluate(_block, _block.instructions[index])
+
+        # Reescreve o código com as constantes encontradas
+        _prev = None
+        _block = cfg
+        while _block is not None:
+            if _block not in _executable:
+                _prev.next_block = _block.next_block
+                _block = _block.next_block
+                continue
+
+            _instructions = []
+            for inst in _block.instructions:
+                _field = self.get_def_field(inst)
+                _target = inst[_field] if _field is not None else None
+                _value = _values.get(_target)
+
+                if inst[0] == "cbranch" and _values.get(inst[1]) not in (None, _bottom):
+                    inst = ("jump", inst[2] if _values[inst[1]][0] else inst[3])
+                elif inst[0].startswith("phi_"):
+                    _phi = [inst[0]]
+                    for index in range(1, len(inst) - 1, 2):
+                        if (_labels[inst[index + 1]], _block) in _edges:
+                            _phi += [inst[index], inst[index + 1]]
+                    inst = tuple(_phi + [inst[-1]])
+
+                if _value not in (None, _bottom) and not inst[0].startswith("literal_"):
+                    _type = (
+                        "bool" if isinstance(_value[0], bool)
+                        else "float" if isinstance(_value[0], float)
+                        else "int"
+                    )
+                    inst = ("literal_" + _type, _value[0], _target)
+
+                _instructions.append(inst)
+            _block.instructions = _instructions
+            _prev = _block
+            _block = _block.next_block
+
+        self.rebuild_code(cfg)
+        self.remove_unused_ssa_values()
+
+    def global_value_numbering(self):
+        """
+        Numeração global de valores sobre a árvore de dominadores. Uma
+        instrução sem efeitos colaterais (literal, aritmética, conversão,
+        elem) que repete uma computação de um bloco dominador é removida e
+        seus usos passam a usar o resultado anterior. Loads só são
+        reaproveitados dentro de blocos básicos estendidos (bloco com um
+        único predecessor herda as informações dele) e são invalidados por
+        stores e chamadas de função. Um store também repassa o valor
+        armazenado para os loads seguintes do mesmo endereço.
+        """
+        cfg = self.build_cfg()
+        self.compute_dominators(cfg)
+
+        _replace = {}
+
+        def find(reg):
+            while reg in _replace:
+                reg = _replace[reg]
+            return reg
+
+        def is_ssa(reg):
+            return len(self.get_defs(reg)) <= 1
+
+        _walk = [(cfg, {}, {})]
+        while _walk:
+            _block, _values, _memory = _walk.pop()
+
+            # Loads só continuam válidos se o bloco tem um único predecessor
+            if len(_block.predecessors) != 1:
+                _memory = {}
+            _values = dict(_values)
+            _memory = dict(_memory)
+
+            _instructions = []
+            for inst in _block.instructions:
+                for _field in self.get_use_fields(inst):
+                    if inst[_field] in _replace:
+                        inst = self.modify_inst_field(inst, _field, find(inst[_field]))
+
+                _op = inst[0].split("_")
+                _field = self.get_def_field(inst)
+                _target = inst[_field] if _field is not None else None
+                _fields = self.get_use_fields(inst)
+                _key = None
+
+                # Operações que alteram a memória invalidam os loads
+                if _op[0] in ("store", "call", "read"):
+                    _memory = {}
+                    if _op[0] == "store" and len(_op) <= 3 and _op[-1] in ("int", "float", "char", "bool", "*"):
+                        _memory[(_op[1], inst[2])] = inst[1]
+                elif _op[0] == "load" and len(_op) <= 3 and _op[-1] in ("int", "float", "char", "bool", "*"):
+                    _key = (_op[1], inst[1])
+                    if _key in _memory and is_ssa(_target):
+                        _replace[_target] = _memory[_key]
+                        continue
+                    if is_ssa(_target) and is_ssa(inst[1]):
+                        _memory[_key] = _target
+                    _key = None
+                elif _op[0] == "literal":
+                    _key = (inst[0], type(inst[1]).__name__, inst[1])
+                elif inst[0] in constant_folding or _op[0] == "elem":
+                    _operands = [inst[x] for x in _fields]
+                    if _op[0] in ("add", "mul", "eq", "ne"):
+                        _operands.sort()
+                    if all(is_ssa(x) for x in _operands):
+                        _key = tuple([inst[0]] + _operands)
+
+                if _key is not None and is_ssa(_target):
+                    if _key in _values:
+                        _replace[_target] = _values[_key]
+                        continue
+                    _values[_key] = _target
+
+                _instructions.append(inst)
+            _block.instructions = _instructions
+
+            for _child in self.dom_children[_block]:
+                _walk.append((_child, _values, _memory))
+
+        # Aplica as substituições nos usos restantes (phi de blocos que
+        # ainda não tinham sido visitados, por exemplo)
+        _block = cfg
+        while _block is not None:
+            for index in range(len(_block.instructions)):
+                inst = _block.instructions[index]
+                for _field in self.get_use_fields(inst):
+                    if inst[_field] in _replace:
+                        inst = self.modify_inst_field(inst, _field, find(inst[_field]))
+                _block.instructions[index] = inst
+            _block = _block.next_block
+
+        self.rebuild_code(cfg)
+
+    def find_natural_loops(self, cfg):
+        """
+        Encontra os laços naturais do grafo de fluxo de controle. Uma aresta
+        b -> h é de retorno quando h domina b; o corpo do laço é h mais os
+        blocos que alcançam b sem passar por h. Laços com o mesmo cabeçalho
+        são unidos. Devolve pares (cabeçalho, corpo), dos laços mais
+        internos para os mais externos. Requer compute_dominators.
+        """
+        _loops = {}
+        for _block in self.rpo:
+            for _sucessor in self.get_block_sucessors(_block):
+                if not self.dominates(_sucessor, _block):
+                    continue
+                _body = _loops.setdefault(_sucessor, {_sucessor})
+                _stack = [_block]
+                while _stack:
+                    _node = _stack.pop()
+                    if _node in _body:
+                        continue
+                    _body.add(_node)
+                    _stack.extend(x for x in _node.predecessors if x in self.idom)
+
+        return sorted(_loops.items(), key=lambda x: len(x[1]))
+
+    def get_previous_block(self, cfg, block):
+        """
+        Recupera o bloco anterior a um bloco na lista encadeada.
+        """
+        _block = cfg
+        while _block.next_block is not block:
+            _block = _block.next_block
+        return _block
+
+    def insert_preheader(self, cfg, header, body):
+        """
+        Recupera o pré-cabeçalho de um laço: bloco fora do laço cujo único
+        sucessor é o cabeçalho e que é o único predecessor de fora do laço.
+        O bloco da definição da função não tem label e não serve como
+        pré-cabeçalho. Se não existir, cria um bloco vazio logo antes do
+        cabeçalho e redireciona para ele as arestas de fora do laço,
+        juntando os argumentos dos phis do cabeçalho.
+        """
+        _outside = [x for x in header.predecessors if x not in body]
+        if len(_outside) == 1 and _outside[0] is not cfg and self.get_block_sucessors(_outside[0]) == [header]:
+            return _outside[0]
+
+        _label = self.new_label(header.label)
+        _preheader = BasicBlock(_label)
+        _preheader.instructions = [(_label + ":",)]
+        _preheader.branch = header
+        _preheader.predecessors = _outside
+
+        # O bloco anterior ao cabeçalho passaria a cair no pré-cabeçalho
+        _previous = self.get_previous_block(cfg, header)
+        if _previous in body and _previous.instructions and not self.is_terminator(_previous.instructions[-1]):
+            _previous.instructions.append(("jump", "%" + header.label))
+        _previous.next_block = _preheader
+        _preheader.next_block = header
+
+        # Redireciona os saltos de fora do laço
+        _old, _new = "%" + header.label, "%" + _label
+        for _pred in _outside:
+            inst = _pred.instructions[-1]
+            if inst[0] == "jump" and inst[1] == _old:
+                _pred.instructions[-1] = ("jump", _new)
+            elif inst[0] == "cbranch":
+                _pred.instructions[-1] = tuple(_new if x == _old else x for x in inst)
+            if isinstance(_pred, ConditionBlock):
+                if _pred.taken is header:
+                    _pred.taken = _preheader
+                if _pred.fall_through is header:
+                    _pred.fall_through = _preheader
+            else:
+                _pred.branch = _preheader
+        header.predecessors = [x for x in header.predecessors if x in body] + [_preheader]
+
+        # Os argumentos de fora do laço passam a vir do pré-cabeçalho
+        _outside_labels = ["%" + str(x.label) for x in _outside]
+        for index in range(len(header.instructions)):
+            inst = header.instructions[index]
+            if not inst[0].startswith("phi_"):
+                continue
+            _args = []
+            _values = []
+            for _field in range(1, len(inst) - 1, 2):
+                if inst[_field + 1] in _outside_labels:
+                    _values.extend(inst[_field:_field + 2])
+                else:
+                    _args.extend(inst[_field:_field + 2])
+            if not _values:
+                continue
+            if len(set(_values[0::2])) == 1:
+                _value = _values[0]
+            else:
+                _value = self.new_temp()
+                _preheader.instructions.append(tuple([inst[0]] + _values + [_value]))
+            header.instructions[index] = tuple([inst[0]] + _args + [_value, _new, inst[-1]])
+
+        return _preheader
+
+    def loop_invariant_code_motion(self):
+        """
+        Move para o pré-cabeçalho dos laços as instruções invariantes: sem
+        efeitos colaterais e com operandos definidos fora do laço ou por
+        outras instruções invariantes. Divisões e resto não são movidos,
+        pois poderiam falhar num laço que não executa. Loads de variáveis
+        só são movidos se o laço não tem chamadas, leituras nem stores
+        para a mesma variável. Os laços internos são tratados primeiro, de
+        modo que as instruções podem subir vários níveis.
+        """
+        cfg = self.build_cfg()
+        self.compute_dominators(cfg)
+        _loops = self.find_natural_loops(cfg)
+        if not _loops:
+            return
+
+        # Bloco e quantidade de definições de cada registrador
+        _def_block = {}
+        _def_count = {}
+        _memory = set()
+        for _block in self.rpo:
+            for inst in _block.instructions:
+                _field = self.get_def_field(inst)
+                if _field is not None:
+                    _def_block[inst[_field]] = _block
+                    _def_count[inst[_field]] = _def_count.get(inst[_field], 0) + 1
+                if inst[0].startswith("alloc_"):
+                    _memory.add(inst[1])
+
+        _order = list(self.rpo)
+        for index in range(len(_loops)):
+            _header, _body = _loops[index]
+
+            # Efeitos na memória dentro do laço
+            _calls = False
+            _stored = set()
+            for _block in _body:
+                for inst in _block.instructions:
+                    _op = inst[0].split("_")[0]
+                    if _op in ("call", "read"):
+                        _calls = True
+                    elif _op == "store":
+                        _stored.add(inst[2])
+
+            def invariant(reg):
+                return _def_block.get(reg) not in _body
+
+            _hoisted = []
+            for _block in [x for x in _order if x in _body]:
+                _instructions = []
+                for inst in _block.instructions:
+                    _op = inst[0].split("_")
+                    _field = self.get_def_field(inst)
+                    _move = (
+                        _field is not None
+                        and _def_count.get(inst[_field]) == 1
+                        and all(invariant(inst[x]) for x in self.get_use_fields(inst))
+                    )
+                    if not _move:
+                        pass
+                    elif _op[0] == "load" and len(_op) == 2:
+                        if inst[1][:1] == "@" or inst[1] in _memory:
+                            _move = not _calls and inst[1] not in _stored
+                    elif _op[0] in ("div", "mod"):
+                        _move = False
+                    else:
+                        _move = _op[0] in ("literal", "elem", "sitofp", "fptosi") or inst[0] in constant_folding
+
+                    if _move:
+                        _hoisted.append(inst)
+                        _def_block[inst[_field]] = None
+                    else:
+                        _instructions.append(inst)
+                _block.instructions = _instructions
+
+            if not _hoisted:
+                continue
+
+            _preheader = self.insert_preheader(cfg, _header, _body)
+            if _preheader not in _order:
+                _order.insert(_order.index(_header), _preheader)
+                for _other_header, _other_body in _loops[index + 1:]:
+                    if _header in _other_body:
+                        _other_body.add(_preheader)
+            for inst in _hoisted:
+                _def_block[inst[self.get_def_field(inst)]] = _preheader
+            _position = len(_preheader.instructions)
+            if _preheader.instructions and self.is_terminator(_preheader.instructions[-1]):
+                _position -= 1
+            _preheader.instructions[_position:_position] = _hoisted
+
+        self.rebuild_code(cfg)
+
+    def find_induction_variables(self, header, body, defs):
+        """
+        Encontra as variáveis de indução básicas de um laço: phi_int do
+        cabeçalho que recebe, de todos os predecessores dentro do laço, o
+        mesmo valor i + c ou i - c, com c invariante. Devolve um dicionário
+        phi -> (instrução de incremento, bloco do incremento).
+        """
+        _inside = ["%" + str(x.label) for x in header.predecessors if x in body]
+        _ivs = {}
+        for inst in header.instructions:
+            if inst[0] != "phi_int":
+                continue
+            _next = set(inst[x] for x in range(1, len(inst) - 1, 2) if inst[x + 1] in _inside)
+            if len(_next) != 1:
+                continue
+            _next = _next.pop()
+            if _next not in defs or defs[_next][0] not in body:
+                continue
+            _update, _block = defs[_next][1], defs[_next][0]
+            _iv = inst[-1]
+            if _update[0] == "add_int" and _iv in _update[1:3]:
+                _step = _update[2] if _update[1] == _iv else _update[1]
+            elif _update[0] == "sub_int" and _update[1] == _iv:
+                _step = _update[2]
+            else:
+                continue
+            if _step not in defs or defs[_step][0] not in body:
+                _ivs[_iv] = (_update, _block)
+        return _ivs
+
+    def strength_reduction(self):
+        """
+        Redução de força das variáveis de indução. Um elem cujo índice é uma
+        função linear (somas e produtos por invariantes) de uma variável de
+        indução básica vira um ponteiro incrementado a cada iteração, com
+        valor inicial calculado no pré-cabeçalho. As famílias com produto
+        são sempre reduzidas; as demais apenas se a variável de indução
+        deixa de ser usada, trocando as comparações dela por comparações do
+        ponteiro (substituição da condição de teste). A variável de indução
+        morta e as instruções que calculavam os índices são removidas.
+        """
+        _done = set()
+        _changed = True
+        while _changed:
+            _changed = False
+            cfg = self.build_cfg()
+            self.compute_dominators(cfg)
+            for _header, _body in self.find_natural_loops(cfg):
+                if _header.label in _done:
+                    continue
+                _done.add(_header.label)
+                if self.reduce_loop(cfg, _header, _body):
+                    self.rebuild_code(cfg)
+                    self.remove_unused_ssa_values()
+                    _changed = True
+                    break
+
+    def reduce_loop(self, cfg, header, body):
+        """
+        Aplica a redução de força a um laço. Devolve True se o código mudou.
+        """
+        # Instrução e bloco que definem cada registrador
+        _defs = {}
+        _uses = {}
+        for _block in self.rpo:
+            for inst in _block.instructions:
+                _field = self.get_def_field(inst)
+                if _field is not None:
+                    _defs[inst[_field]] = (_block, inst)
+                for _field in self.get_use_fields(inst):
+                    _uses.setdefault(inst[_field], []).append((_block, inst))
+
+        def invariant(reg):
+            return reg not in _defs or _defs[reg][0] not in body
+
+        _ivs = self.find_induction_variables(header, body, _defs)
+        if not _ivs:
+            return False
+
+        # Registradores que são funções lineares de uma variável de indução:
+        # reg -> (variável de indução, operações aplicadas a ela)
+        _linear = {_iv: (_iv, ()) for _iv in _ivs}
+        for _block in [x for x in self.rpo if x in body]:
+            for inst in _block.instructions:
+                _op = inst[0]
+                if _op == "load_int" and inst[1] in _linear:
+                    _linear[inst[2]] = _linear[inst[1]]
+                elif _op in ("add_int", "sub_int", "mul_int"):
+                    if inst[1] in _linear and invariant(inst[2]):
+                        _iv, _ops = _linear[inst[1]]
+                        _linear[inst[3]] = (_iv, _ops + ((_op, inst[2]),))
+                    elif _op != "sub_int" and inst[2] in _linear and invariant(inst[1]):
+                        _iv, _ops = _linear[inst[2]]
+                        _linear[inst[3]] = (_iv, _ops + ((_op, inst[1]),))
+
+        # Agrupa os elem com índice linear em famílias de ponteiros
+        _families = {}
+        for _block in [x for x in self.rpo if x in body]:
+            for inst in _block.instructions:
+                if inst[0].startswith("elem_") and invariant(inst[1]) and inst[2] in _linear:
+                    _iv, _ops = _linear[inst[2]]
+                    _families.setdefault((inst[1], _iv, _ops), []).append(inst)
+
+        # Famílias sem produtos servem para reescrever as comparações
+        _compares = {}
+        for _key in _families:
+            if all(_op != "mul_int" for _op, _ in _key[2]):
+                _compares.setdefault(_key[1], _key)
+
+        def absorbed(reg, iv, visiting):
+            # Verifica se todos os usos do registrador somem com a redução
+            if reg in visiting:
+                return True
+            visiting.add(reg)
+            for _block, inst in _uses.get(reg, []):
+                if _block not in body:
+                    return False
+                _field = self.get_def_field(inst)
+                if inst[0].startswith("elem_") and inst[2] == reg and invariant(inst[1]):
+                    continue
+                if inst is _ivs[iv][0] or (inst[0] == "phi_int" and inst[-1] == iv):
+                    absorbed(inst[-1], iv, visiting)
+                    continue
+                if reg == iv and inst[0].split("_")[0] in ("lt", "le", "gt", "ge", "eq", "ne"):
+                    _other = inst[2] if inst[1] == reg else inst[1]
+                    if iv in _compares and invariant(_other):
+                        continue
+                if _field is not None and _linear.get(inst[_field], (None,))[0] == iv:
+                    if absorbed(inst[_field], iv, visiting):
+                        continue
+                return False
+            return True
+
+        _dead = {_iv for _iv in _ivs if absorbed(_iv, _iv, set())}
+        _selected = [x for x in _families if x[1] in _dead or any(_op == "mul_int" for _op, _ in x[2])]
+        if not _selected:
+            return False
+
+        _preheader = self.insert_preheader(cfg, header, body)
+        _pre_label = "%" + str(_preheader.label)
+        _inside = ["%" + str(x.label) for x in header.predecessors if x in body]
+        _phis = {inst[-1]: inst for inst in header.instructions if inst[0].startswith("phi_")}
+        _pre_code = []
+        _replace = {}
+        _pointers = {}
+        _steps = {}
+
+        def emit(op, a, b):
+            _temp = self.new_temp()
+            _pre_code.append((op, a, b, _temp))
+            return _temp
+
+        for _key in _selected:
+            _base, _iv, _ops = _key
+            _update, _update_block = _ivs[_iv]
+            _phi = _phis[_iv]
+            _init = [_phi[x] for x in range(1, len(_phi) - 1, 2) if _phi[x + 1] == _pre_label][0]
+            _elem = _families[_key][0][0]
+
+            # Valor inicial do ponteiro
+            _value = _init
+            for _op, _reg in _ops:
+                _value = emit(_op, _value, _reg)
+            _start = self.new_temp()
+            _pre_code.append((_elem, _base, _value, _start))
+
+            # Passo do ponteiro: o passo da variável vezes os fatores
+            _factors = tuple(_reg for _op, _reg in _ops if _op == "mul_int")
+            if (_iv, _factors) not in _steps:
+                _step = _update[2] if _update[1] == _iv else _update[1]
+                for _reg in _factors:
+                    _step = emit("mul_int", _step, _reg)
+                _steps[(_iv, _factors)] = _step
+            _step = _steps[(_iv, _factors)]
+
+            # phi do ponteiro no cabeçalho e incremento junto ao da variável
+            _pointer = self.new_temp()
+            _next = self.new_temp()
+            _args = [_start, _pre_label]
+            for _label in _inside:
+                _args += [_next, _label]
+            header.instructions.insert(1, tuple(["phi_int"] + _args + [_pointer]))
+            _position = _update_block.instructions.index(_update) + 1
+            _update_block.instructions.insert(_position, (_update[0], _pointer, _step, _next))
+
+            _pointers[_key] = _pointer
+            for inst in _families[_key]:
+                _replace[inst[-1]] = _pointer
+
+        # Substituição da condição de teste das variáveis de indução mortas
+        _bounds = {}
+        for _block in [x for x in self.rpo if x in body]:
+            for index in range(len(_block.instructions)):
+                inst = _block.instructions[index]
+                _op = inst[0].split("_")
+                if _op[0] not in ("lt", "le", "gt", "ge", "eq", "ne") or _op[-1] != "int":
+                    continue
+                for _field, _other in ((1, 2), (2, 1)):
+                    _iv = inst[_field]
+                    if _iv in _dead and _iv in _compares and invariant(inst[_other]):
+                        _key = _compares[_iv]
+                        if (_key, inst[_other]) not in _bounds:
+                            _value = inst[_other]
+                            for _op2, _reg in _key[2]:
+                                _value = emit(_op2, _value, _reg)
+                            _bound = self.new_temp()
+                            _pre_code.append((_families[_key][0][0], _key[0], _value, _bound))
+                            _bounds[(_key, inst[_other])] = _bound
+                        inst = self.modify_inst_field(inst, _field, _pointers[_key])
+                        inst = self.modify_inst_field(inst, _other, _bounds[(_key, inst[_other])])
+                        _block.instructions[index] = inst
+                        break
+
+        _position = len(_preheader.instructions)
+        if _preheader.instructions and self.is_terminator(_preheader.instructions[-1]):
+            _position -= 1
+        _preheader.instructions[_position:_position] = _pre_code
+
+        # Troca os elem reduzidos pelos ponteiros e remove as variáveis de
+        # indução mortas (o phi e o incremento só usam um ao outro)
+        _block = cfg
+        while _block is not None:
+            _instructions = []
+            for inst in _block.instructions:
+                if inst[0].startswith("elem_") and inst[-1] in _replace:
+                    continue
+                if inst[0] == "phi_int" and inst[-1] in _dead and _block is header:
+                    continue
+                if any(inst is _ivs[_iv][0] for _iv in _dead):
+                    continue
+                for _field in self.get_use_fields(inst):
+                    if inst[_field] in _replace:
+                        inst = self.modify_inst_field(inst, _field, _replace[inst[_field]])
+                _instructions.append(inst)
+            _block.instructions = _instructions
+            _block = _block.next_block
+
+        return True
+
+    def get_value_type(self, inst):
+        """
+        Recupera o tipo do valor definido por uma instrução.
+        """
+        _op = inst[0].split("_")
+        if _op[0] in ("lt", "le", "gt", "ge", "eq", "ne", "and", "or", "not"):
+            return "bool"
+        if _op[0] == "sitofp":
+            return "float"
+        if _op[0] == "fptosi":
+            return "int"
+        return _op[1]
+
+    def copy_loop(self, blocks, header, values, header_label, next_label):
+        """
+        Copia os blocos de um laço para uma nova iteração. Os phis do
+        cabeçalho são trocados pelos valores de entrada da iteração (values),
+        os registradores definidos no laço ganham novos nomes e as arestas
+        de retorno passam a ir para next_label. Devolve as cópias, na mesma
+        ordem dos blocos, o mapa de registradores e o mapa de labels.
+        """
+        _labels = {"%" + x.label: "%" + self.new_label(x.label) for x in blocks if x is not header}
+        _labels["%" + header.label] = "%" + header_label
+        _rename = dict(values)
+        for _block in blocks:
+            for inst in _block.instructions:
+                _field = self.get_def_field(inst)
+                if _field is None or inst[0].split("_")[0] in ("store", "alloc", "read"):
+                    continue
+                if not (_block is header and inst[0].startswith("phi_")):
+                    _rename[inst[_field]] = self.new_temp()
+
+        def target(label):
+            if label == "%" + header.label:
+                return next_label
+            return _labels.get(label, label)
+
+        _copies = []
+        for _block in blocks:
+            _copy = BasicBlock(_labels["%" + _block.label][1:])
+            for inst in _block.instructions:
+                if self.is_label(inst):
+                    inst = (_copy.label + ":",)
+                elif inst[0] == "jump":
+                    inst = ("jump", target(inst[1]))
+                elif inst[0] == "cbranch":
+                    inst = ("cbranch", _rename.get(inst[1], inst[1]), target(inst[2]), target(inst[3]))
+                elif _block is header and inst[0].startswith("phi_"):
+                    continue
+                else:
+                    for _field in self.get_use_fields(inst):
+                        inst = self.modify_inst_field(inst, _field, _rename.get(inst[_field], inst[_field]))
+                    if inst[0].startswith("phi_"):
+                        inst = tuple(
+                            _labels.get(x, x) if index % 2 == 0 and index > 0 else x
+                            for index, x in enumerate(inst[:-1])
+                        ) + inst[-1:]
+                    _field = self.get_def_field(inst)
+                    if _field is not None and inst[_field] in _rename:
+                        inst = self.modify_inst_field(inst, _field, _rename[inst[_field]])
+                _copy.instructions.append(inst)
+            _copies.append(_copy)
+
+        return _copies, _rename, _labels
+
+    def get_trip_count(self, header, body, defs, limit):
+        """
+        Calcula quantas vezes o corpo de um laço executa, quando o teste do
+        cabeçalho compara uma variável de indução com valor inicial, passo e
+        limite constantes. Devolve None se não for possível ou se passar do
+        limite.
+        """
+        inst = header.instructions[-1]
+        _cond = defs.get(inst[1], (None, None))[1]
+        if _cond is None or _cond[0] not in constant_folding or len(_cond) != 4:
+            return None
+        _ivs = self.find_induction_variables(header, body, defs)
+
+        def constant(reg):
+            _def = defs.get(reg, (None, None))[1]
+            if _def is not None and _def[0] == "literal_int":
+                return _def[1]
+            return None
+
+        # Identifica a variável de indução e os valores constantes
+        _phis = {x[-1]: x for x in header.instructions if x[0].startswith("phi_")}
+        _iv = [x for x in _cond[1:3] if x in _ivs]
+        if len(_iv) != 1:
+            return None
+        _iv = _iv[0]
+        _update = _ivs[_iv][0]
+        _step = constant(_update[2] if _update[1] == _iv else _update[1])
+        _other = _cond[2] if _cond[1] == _iv else _cond[1]
+        _bound = constant(_other)
+        _outside = ["%" + str(x.label) for x in header.predecessors if x not in body]
+        _phi = _phis[_iv]
+        _init = [_phi[x] for x in range(1, len(_phi) - 1, 2) if _phi[x + 1] in _outside]
+        if len(_init) != 1 or _step is None or _bound is None:
+            return None
+        _value = constant(_init[0])
+        if _value is None:
+            return None
+
+        # Simula o laço
+        _inside = any("%" + str(x.label) == inst[2] for x in body)
+        _fold = constant_folding[_cond[0]]
+        _count = 0
+        while True:
+            if _cond[1] == _iv:
+                _result = _fold(_value, _bound)
+            else:
+                _result = _fold(_bound, _value)
+            if bool(_result) != _inside:
+                return _count
+            _count += 1
+            if _count > limit:
+                return None
+            _value = _value + _step if _update[0] == "add_int" else _value - _step
+
+    def loop_unrolling(self):
+        """
+        Desenrola laços na forma SSA. Laços com número de iterações
+        constante e até unroll_threshold iterações são totalmente
+        desenrolados; laços internos com número de iterações desconhecido
+        são replicados unroll_factor vezes, mantendo o teste em cada cópia.
+        Em ambos os casos o código adicionado não passa de unroll_budget
+        instruções. Só são tratados laços com um único retorno e cuja única
+        saída é o teste do cabeçalho. Devolve True se o código mudou.
+        """
+        _done = set()
+        _changed = False
+        _retry = True
+        while _retry:
+            _retry = False
+            cfg = self.build_cfg()
+            self.compute_dominators(cfg)
+            _loops = self.find_natural_loops(cfg)
+            for _header, _body in _loops:
+                if _header.label in _done:
+                    continue
+                _done.add(_header.label)
+                _inner = not any(x is not _header and x in _body for x, _ in _loops)
+                _labels = self.unroll_loop(cfg, _header, _body, _inner)
+                if _labels:
+                    _done.update(_labels)
+                    self.rebuild_code(cfg)
+                    self.remove_unused_ssa_values()
+                    _changed = _retry = True
+                    break
+        return _changed
+
+    def unroll_loop(self, cfg, header, body, inner):
+        """
+        Desenrola um laço. Devolve as labels criadas ou None se o laço não
+        foi alterado.
+        """
+        inst = header.instructions[-1]
+        if inst[0] != "cbranch" or len([x for x in header.predecessors if x in body]) != 1:
+            return None
+        for _block in body:
+            if _block is not header and any(x not in body for x in self.get_block_sucessors(_block)):
+                return None
+        _exits = [x for x in self.get_block_sucessors(header) if x not in body]
+        if len(_exits) != 1:
+            return None
+        _exit = _exits[0]
+        _size = sum(len(x.instructions) for x in body)
+
+        _defs = {}
+        for _block in self.rpo:
+            for _inst in _block.instructions:
+                _field = self.get_def_field(_inst)
+                if _field is not None:
+                    _defs[_inst[_field]] = (_block, _inst)
+
+        _trips = self.get_trip_count(header, body, _defs, self.unroll_threshold)
+        if _trips is not None and _trips * _size <= self.unroll_budget:
+            _copies = _trips
+        elif inner and self.unroll_factor > 1 and (self.unroll_factor - 1) * _size <= self.unroll_budget:
+            if _exit.predecessors != [header]:
+                return None
+            _trips = None
+            _copies = self.unroll_factor - 1
+        else:
+            return None
+
+        # Blocos do laço na ordem do código, começando pelo cabeçalho, todos
+        # terminados por um salto explícito
+        _order = [header]
+        _block = cfg
+        while _block is not None:
+            if _block in body and _block is not header:
+                _order.append(_block)
+            _block = _block.next_block
+        for _block in _order:
+            if not self.is_terminator(_block.instructions[-1]):
+                _block.instructions.append(("jump", "%" + _block.branch.label))
+
+        _preheader = self.insert_preheader(cfg, header, body)
+        _pre_label = "%" + str(_preheader.label)
+        _latch = [x for x in header.predecessors if x in body][0]
+        _latch_label = "%" + str(_latch.label)
+        _phis = [x for x in header.instructions if x[0].startswith("phi_")]
+
+        def argument(phi, label):
+            return [phi[x] for x in range(1, len(phi) - 1, 2) if phi[x + 1] == label][0]
+
+        _header_labels = [self.new_label(header.label) for _ in range(_copies + 1)]
+        _new = []
+        _exit_phis = []
+        if _trips is not None:
+            # Desenrolamento total: uma cópia por iteração e uma última
+            # cópia do cabeçalho, que sai do laço
+            _values = {x[-1]: argument(x, _pre_label) for x in _phis}
+            for index in range(_copies + 1):
+                _blocks = _order if index < _copies else [header]
+                _next = "%" + _header_labels[index + 1] if index < _copies else None
+                _blocks, _rename, _labels = self.copy_loop(_blocks, header, _values, _header_labels[index], _next)
+                _branch = _blocks[0].instructions[-1]
+                _inside = _branch[2] if _branch[3] == "%" + _exit.label else _branch[3]
+                if index < _copies:
+                    _blocks[0].instructions[-1] = ("jump", _inside)
+                    _values = {x[-1]: _rename.get(argument(x, _latch_label), argument(x, _latch_label)) for x in _phis}
+                else:
+                    _blocks[0].instructions[-1] = ("jump", "%" + _exit.label)
+                _new += _blocks
+
+            # Os valores do cabeçalho usados depois do laço vêm da última cópia
+            _outside_rename = _rename
+            _entry = "%" + _header_labels[0]
+            _exit_label = "%" + _header_labels[-1]
+        else:
+            # Desenrolamento parcial: cópias encadeadas do laço inteiro, a
+            # última volta para o cabeçalho original
+            _renames = []
+            _latches = []
+            _values = {x[-1]: argument(x, _latch_label) for x in _phis}
+            for index in range(1, _copies + 1):
+                _next = "%" + _header_labels[index + 1] if index < _copies else "%" + header.label
+                _blocks, _rename, _labels = self.copy_loop(_order, header, _values, _header_labels[index], _next)
+                _values = {x[-1]: _rename.get(argument(x, _latch_label), argument(x, _latch_label)) for x in _phis}
+                _renames.append(_rename)
+                _latches.append(_labels[_latch_label])
+                _new += _blocks
+
+            # A aresta de retorno original vai para a primeira cópia e os
+            # phis do cabeçalho recebem os valores da última
+            _terminator = _latch.instructions[-1]
+            _latch.instructions[-1] = tuple(
+                "%" + _header_labels[1] if x == "%" + header.label else x for x in _terminator
+            )
+            for index in range(len(header.instructions)):
+                _phi = header.instructions[index]
+                if not _phi[0].startswith("phi_"):
+                    continue
+                _args = list(_phi)
+                for _field in range(1, len(_phi) - 1, 2):
+                    if _phi[_field + 1] == _latch_label:
+                        _args[_field] = _values[_phi[-1]]
+                        _args[_field + 1] = _latches[-1]
+                header.instructions[index] = tuple(_args)
+
+            # Valores do cabeçalho usados depois do laço passam por um phi
+            # na saída, que agora tem um predecessor por cópia
+            _header_defs = {}
+            for _inst in header.instructions:
+                _field = self.get_def_field(_inst)
+                if _field is not None:
+                    _header_defs[_inst[_field]] = _inst
+            _used = set()
+            _block = cfg
+            while _block is not None:
+                if _block not in body:
+                    for _inst in _block.instructions:
+                        _used.update(_inst[x] for x in self.get_use_fields(_inst) if _inst[x] in _header_defs)
+                _block = _block.next_block
+            _outside_rename = {}
+            for _reg in sorted(_used):
+                _args = [_reg, "%" + header.label]
+                for index in range(_copies):
+                    _args += [_renames[index].get(_reg, _reg), "%" + _header_labels[index + 1]]
+                _outside_rename[_reg] = self.new_temp()
+                _type = self.get_value_type(_header_defs[_reg])
+                _exit_phis.append(tuple(["phi_" + _type] + _args + [_outside_rename[_reg]]))
+            _entry = None
+            _exit_label = None
+
+        # Redireciona a entrada e a saída do laço e os usos posteriores
+        if _entry is not None and _preheader.instructions[-1][0] == "jump":
+            _preheader.instructions[-1] = ("jump", _entry)
+        _block = cfg
+        while _block is not None:
+            if _block not in body and _block not in _new:
+                for index in range(len(_block.instructions)):
+                    _inst = _block.instructions[index]
+                    if _exit_label is not None and _block is _exit and _inst[0].startswith("phi_"):
+                        _inst = tuple(_exit_label if x == "%" + header.label else x for x in _inst)
+                    for _field in self.get_use_fields(_inst):
+                        if _inst[_field] in _outside_rename:
+                            _inst = self.modify_inst_field(_inst, _field, _outside_rename[_inst[_field]])
+                    _block.instructions[index] = _inst
+            _block = _block.next_block
+        _exit.instructions[1:1] = _exit_phis
+
+        # As cópias ficam logo depois do laço; no desenrolamento total, os
+        # blocos originais saem da lista
+        _block = header
+        while _block.next_block is not None and _block.next_block in body:
+            _block = _block.next_block
+        _after = _block.next_block
+        for _copy in _new:
+            _block.next_block = _copy
+            _block = _copy
+        _block.next_block = _after
+        if _trips is not None:
+            _block = cfg
+            while _block is not None:
+                while _block.next_block in body:
+                    _block.next_block = _block.next_block.next_block
+                _block = _block.next_block
+
+        return [x.label for x in _new]
+
+    def destruct_ssa(self):
+        """
+        Destrói a forma SSA, trocando cada phi por cópias nos blocos
+        predecessores. Cada phi usa um temporário intermediário, o que evita
+        os problemas de cópia perdida e de troca sem dividir arestas. A cópia
+        é feita com load_<tipo>, que no interpretador copia o conteúdo de um
+        registrador para outro.
+        """
+        cfg = self.build_cfg()
+        _labels = {}
+        _block = cfg
+        while _block is not None:
+            _labels["%" + str(_block.label)] = _block
+            _block = _block.next_block
+
+        _block = cfg
+        while _block is not None:
+            _instructions = []
+            for inst in _block.instructions:
+                if not inst[0].startswith("phi_"):
+                    _instructions.append(inst)
+                    continue
+
+                _load = "load_" + inst[0][4:]
+                _temp = self.new_temp()
+                for index in range(1, len(inst) - 1, 2):
+                    _pred = _labels[inst[index + 1]]
+                    _copy = (_load, inst[index], _temp)
+                    if self.is_terminator(_pred.instructions[-1]):
+                        _pred.instructions.insert(len(_pred.instructions) - 1, _copy)
+                    else:
+                        _pred.instructions.append(_copy)
+                _instructions.append((_load, _temp, inst[-1]))
+            _block.instructions = _instructions
+            _block = _block.next_block
+
+        self.rebuild_code(cfg)
+
+    def is_register(self, value):
+        """
+        Verifica se o operando é um registrador (temporário ou variável local).
+        """
+        return isinstance(value, str) and value.startswith("%")
+
+    def is_copy(self, inst):
+        """
+        Verifica se a instrução apenas copia um registrador escalar para
+        outro (load_<tipo> ou store_<tipo> sem modificadores).
+        """
+        _op = inst[0].split("_")
+        return (
+            len(_op) == 2
+            and _op[0] in ("load", "store")
+            and self.is_register(inst[1])
+            and self.is_register(inst[2])
+        )
+
+    def compute_register_liveness(self, cfg):
+        """
+        Calcula os registradores vivos na saída de cada bloco do CFG.
+        """
+        _blocks = []
+        _block = cfg
+        while _block is not None:
+            _blocks.append(_block)
+            _block = _block.next_block
+
+        _use = {}
+        _def = {}
+        for _block in _blocks:
+            _use[_block] = set()
+            _def[_block] = set()
+            for inst in _block.instructions:
+                for _field in self.get_use_fields(inst):
+                    if self.is_register(inst[_field]) and inst[_field] not in _def[_block]:
+                        _use[_block].add(inst[_field])
+                _field = self.get_def_field(inst)
+                if _field is not None and self.is_register(inst[_field]):
+                    _def[_block].add(inst[_field])
+
+        _in = {x: set() for x in _blocks}
+        _out = {x: set() for x in _blocks}
+        _changed = True
+        while _changed:
+            _changed = False
+            for _block in reversed(_blocks):
+                _out[_block] = set()
+                for _sucessor in self.get_block_sucessors(_block):
+                    _out[_block] |= _in[_sucessor]
+                _new = _use[_block] | (_out[_block] - _def[_block])
+                if _new != _in[_block]:
+                    _in[_block] = _new
+                    _changed = True
+        return _out
+
+    def build_interference_graph(self, cfg):
+        """
+        Monta o grafo de interferência dos registradores: dois registradores
+        interferem quando um é definido enquanto o outro está vivo (a origem
+        de uma cópia não interfere com o destino). Devolve as arestas, os
+        registradores que precisam manter o nome (argumentos e variáveis
+        alocadas) e a lista de cópias.
+        """
+        _live_out = self.compute_register_liveness(cfg)
+        _edges = {}
+        _fixed = set()
+        _copies = []
+
+        def add_edge(a, b):
+            if a != b:
+                _edges.setdefault(a, set()).add(b)
+                _edges.setdefault(b, set()).add(a)
+
+        _block = cfg
+        while _block is not None:
+            _live = set(_live_out[_block])
+            for inst in reversed(_block.instructions):
+                if inst[0].startswith("define_"):
+                    _args = [x[1] for x in inst[2]]
+                    _fixed.update(_args)
+                    for _arg in _args:
+                        _edges.setdefault(_arg, set())
+                        for _reg in _live | set(_args):
+                            add_edge(_arg, _reg)
+                    continue
+                if inst[0].startswith("alloc_"):
+                    _fixed.add(inst[1])
+                _field = self.get_def_field(inst)
+                if _field is not None and self.is_register(inst[_field]):
+                    _target = inst[_field]
+                    _edges.setdefault(_target, set())
+                    if self.is_copy(inst):
+                        _copies.append(inst)
+                    for _reg in _live:
+                        if not (self.is_copy(inst) and _reg == inst[1]):
+                            add_edge(_target, _reg)
+                    _live.discard(_target)
+                for _field in self.get_use_fields(inst):
+                    if self.is_register(inst[_field]):
+                        _live.add(inst[_field])
+            _block = _block.next_block
+
+        return _edges, _fixed, _copies
+
+    def coalesce_copies(self):
+        """
+        Propaga as cópias entre registradores escalares juntando o destino
+        e a origem num único registrador, sempre que os dois não estão
+        vivos ao mesmo tempo com valores diferentes (coalescência agressiva
+        sobre o grafo de interferência). As cópias que se tornam de um
+        registrador para ele mesmo são removidas. Argumentos e variáveis
+        alocadas mantêm o nome, e duas delas nunca são juntadas.
+        """
+        cfg = self.build_cfg()
+        _edges, _fixed, _copies = self.build_interference_graph(cfg)
+
+        def add_edge(a, b):
+            if a != b:
+                _edges.setdefault(a, set()).add(b)
+                _edges.setdefault(b, set()).add(a)
+
+        # Junta origem e destino de cada cópia que não interfere
+        _parent = {}
+
+        def find(reg):
+            while reg in _parent:
+                reg = _parent[reg]
+            return reg
+
+        for inst in _copies:
+            _source = find(inst[1])
+            _target = find(inst[2])
+            if _source == _target or _target in _edges[_source]:
+                continue
+            if _source in _fixed and _target in _fixed:
+                continue
+            if _target in _fixed:
+                _source, _target = _target, _source
+            _parent[_target] = _source
+            for _reg in _edges.pop(_target):
+                _edges[_reg].discard(_target)
+                add_edge(_source, _reg)
+
+        if not _parent:
+            return
+
+        # Renomeia os registradores e descarta as cópias redundantes
+        for index in range(len(self.enumerated_code)):
+            inst = self.enumerated_code[index]
+            if inst is None:
+                continue
+            _fields = self.get_use_fields(inst)
+            if self.get_def_field(inst) is not None:
+                _fields.append(self.get_def_field(inst))
+            for _field in _fields:
+                if self.is_register(inst[_field]):
+                    inst = self.modify_inst_field(inst, _field, find(inst[_field]))
+            if self.is_copy(inst) and inst[1] == inst[2]:
+                inst = None
+            self.enumerated_code[index] = inst
+        self.build_def_use()
+
+    def renumber_registers(self):
+        """
+        Renumera os temporários num conjunto mínimo de nomes, no estilo da
+        alocação por varredura linear: percorrendo o código em ordem, cada
+        temporário recebe o menor número que nenhum registrador vivo ao
+        mesmo tempo (vizinho no grafo de interferência) já recebeu. Como o
+        interpretador reserva uma posição de memória para cada nome, os
+        quadros das funções ficam menores. Argumentos, variáveis alocadas e
+        registradores que guardam vetores mantêm o nome, que não é reusado.
+        """
+        cfg = self.build_cfg()
+        _edges, _fixed, _copies = self.build_interference_graph(cfg)
+
+        # Vetores ocupam várias posições e podem ser acessados por endereços
+        # calculados, então os nomes deles não são reaproveitados
+        for inst in self.enumerated_code:
+            if inst is None:
+                continue
+            _op = inst[0].split("_")
+            if _op[0] == "elem":
+                _fixed.add(inst[1])
+            elif any(x.isdigit() for x in _op[2:]):
+                _fixed.update(x for x in inst[1:] if self.is_register(x))
+
+        # O param guarda o endereço do registrador e o valor só é lido na
+        # chamada, então os registradores passados interferem com tudo que
+        # é definido até a chamada
+        _params = []
+        for inst in self.enumerated_code:
+            if inst is None:
+                continue
+            if inst[0].startswith("param_"):
+                _params.append(inst[1])
+                continue
+            _field = self.get_def_field(inst)
+            if _field is not None and self.is_register(inst[_field]):
+                for _reg in _params:
+                    if _reg != inst[_field]:
+                        _edges.setdefault(_reg, set()).add(inst[_field])
+                        _edges.setdefault(inst[_field], set()).add(_reg)
+            if inst[0].startswith("call_"):
+                _params = []
+
+        # Atribui os números na ordem do código
+        _names = {}
+        for index in range(len(self.enumerated_code)):
+            inst = self.enumerated_code[index]
+            if inst is None:
+                continue
+            _fields = self.get_use_fields(inst)
+            if self.get_def_field(inst) is not None:
+                _fields.append(self.get_def_field(inst))
+            for _field in _fields:
+                _reg = inst[_field]
+                if not self.is_register(_reg) or not _reg[1:].isdigit() or _reg == "%0" or _reg in _fixed:
+                    continue
+                if _reg not in _names:
+                    _busy = {_names[x] for x in _edges.get(_reg, ()) if x in _names}
+                    _number = 1
+                    while "%" + str(_number) in _busy or "%" + str(_number) in _fixed:
+                        _number += 1
+                    _names[_reg] = "%" + str(_number)
+                inst = self.modify_inst_field(inst, _field, _names[_reg])
+
+            # Cópias entre registradores que receberam o mesmo nome
+            if self.is_copy(inst) and inst[1] == inst[2]:
+                inst = None
+            self.enumerated_code[index] = inst
+
+    def loop_rotation(self):
+        """
+        Rotaciona os laços para a forma do-while: o salto de volta para o
+        cabeçalho é trocado por uma cópia do teste do cabeçalho, que desvia
+        direto para o corpo ou para a saída. O cabeçalho original fica como
+        guarda, executado só na entrada do laço, e cada iteração passa a
+        executar um desvio em vez de um salto e um desvio. Só são copiados
+        testes com até rotate_threshold instruções. Devolve True se o
+        código mudou.
+        """
+        _done = set()
+        _changed = False
+        _retry = self.rotate_threshold > 0
+        while _retry:
+            _retry = False
+            cfg = self.build_cfg()
+            self.compute_dominators(cfg)
+            for _header, _body in self.find_natural_loops(cfg):
+                if _header.label in _done or not isinstance(_header, ConditionBlock):
+                    continue
+                _done.add(_header.label)
+                _test = _header.instructions[1:]
+                if len(_test) > self.rotate_threshold:
+                    continue
+                if (_header.taken in _body) == (_header.fall_through in _body):
+                    continue
+                _latches = [
+                    x for x in _header.predecessors
+                    if x in _body and x.instructions[-1] == ("jump", "%" + _header.label)
+                ]
+                if not _latches:
+                    continue
+
+                # O bloco de entrada do corpo vira o novo cabeçalho e não
+                # deve ser rotacionado de novo
+                _entry = _header.taken if _header.taken in _body else _header.fall_through
+                _done.add(_entry.label)
+                for _latch in _latches:
+                    _latch.instructions[-1:] = list(_test)
+                self.rebuild_code(cfg)
+                _changed = _retry = True
+                break
+        return _changed
+
+    def short_circuit_jumps(self):
+        """
+        Simplifica os saltos no fluxo de controle: saltos para blocos que
+        apenas saltam (ou caem) para outro bloco passam a ir direto ao
+        destino final, e desvios com os dois destinos iguais viram saltos.
+        """
+        cfg = self.build_cfg()
+        _labels = {}
+        _block = cfg.next_block
+        while _block is not None:
+            _labels["%" + _block.label] = _block
+            _block = _block.next_block
+
+        def final_target(label):
+            _visited = set()
+            _block = _labels[label]
+            while _block not in _visited and isinstance(_block, BasicBlock) and _block.branch is not None:
+                if len(_block.instructions) == 1:
+                    _visited.add(_block)
+                    _block = _block.branch
+                elif len(_block.instructions) == 2 and _block.instructions[1][0] == "jump":
+                    _visited.add(_block)
+                    _block = _block.branch
+                else:
+                    break
+            return "%" + _block.label
+
+        _block = cfg
+        while _block is not None:
+            if _block.instructions:
+                inst = _block.instructions[-1]
+                if inst[0] == "jump":
+                    inst = ("jump", final_target(inst[1]))
+                elif inst[0] == "cbranch":
+                    inst = ("cbranch", inst[1], final_target(inst[2]), final_target(inst[3]))
+                    if inst[2] == inst[3]:
+                        inst = ("jump", inst[2])
+                _block.instructions[-1] = inst
+            _block = _block.next_block
+
+        self.rebuild_code(cfg)
+
+    def merge_blocks(self):
+        """
+        Mescla blocos no fluxo de controle. Um bloco cujo único sucessor só
+        tem a ele como predecessor absorve as instruções desse sucessor, e
+        blocos vazios sem predecessores são descartados. Ao final, saltos
+        para o bloco seguinte na lista encadeada são removidos.
+        """
+        _changed = True
+        while _changed:
+            _changed = False
+            cfg = self.build_cfg()
+            _block = cfg.next_block
+            while _block is not None:
+                _next = _block.next_block
+                if _next is not None and not _next.predecessors and len(_next.instructions) <= 2:
+                    if len(_next.instructions) == 1 or _next.instructions[1][0] == "jump":
+                        # Bloco vazio inalcançável
+                        _block.next_block = _next.next_block
+                        _changed = True
+                        continue
+                _sucessor = _block.branch if isinstance(_block, BasicBlock) else None
+                if (
+                    _sucessor is not None
+                    and _sucessor is not _block
+                    and _sucessor is not cfg.next_block
+                    and len(_sucessor.predecessors) == 1
+                ):
+                    # Traz as instruções do sucessor para o fim do bloco
+                    _instructions = _block.instructions
+                    if _instructions[-1][0] == "jump":
+                        _instructions = _instructions[:-1]
+                    _instructions += _sucessor.instructions[1:]
+                    if (
+                        isinstance(_sucessor, BasicBlock)
+                        and _sucessor.branch is not None
+                        and not self.is_terminator(_instructions[-1])
+                    ):
+                        _instructions.append(("jump", "%" + _sucessor.branch.label))
+                    _block.instructions = _instructions
+                    _previous = self.get_previous_block(cfg, _sucessor)
+                    _previous.next_block = _sucessor.next_block
+                    _changed = True
+                    break
+                _block = _block.next_block
+            self.rebuild_code(cfg)
+
+        # Remove os saltos para o bloco seguinte
+        for index in range(len(self.enumerated_code) - 1):
+            inst = self.enumerated_code[index]
+            if inst is not None and inst[0] == "jump" and self.enumerated_code[index + 1] == (inst[1][1:] + ":",):
+                self.remove_instructions([index])
+
+    def discard_unused_allocs(self):
+        """
+        Descarta alocações de memória não utilizadas: variáveis locais que
+        nunca são lidas perdem a alocação e os stores que as escrevem.
+        """
+        for index in range(len(self.enumerated_code)):
+            inst = self.enumerated_code[index]
+            if inst is None or not inst[0].startswith("alloc_") or self.du_uses.get(inst[1]):
+                continue
+            _defs = self.du_defs[inst[1]]
+            _ops = [self.enumerated_code[x][0] for x in _defs]
+            if all(x.startswith(("alloc_", "store_")) and len(x.split("_")) == 2 for x in _ops):
+                for _index in list(_defs):
+                    self.remove_def_use(_index)
+                    self.enumerated_code[_index] = None
+
+    def peephole_optimization(self):
+        """
+        Otimizador peephole: desliza uma janela sobre o código e aplica as
+        regras de peephole_rules até que nenhuma se aplique. As regras
+        consultam quantas vezes cada registrador é usado e quais
+        registradores têm como única definição um literal.
+        """
+        _changed = True
+        while _changed:
+            _changed = False
+            self.peephole_uses = {}
+            self.peephole_literals = {}
+            _defs = {}
+            for inst in self.enumerated_code:
+                self.count_peephole_uses(inst, 1)
+                if inst[0].startswith("define_"):
+                    # Os argumentos são definidos na entrada da função
+                    for _type, _arg in inst[2]:
+                        _defs.setdefault(_arg, []).append(inst)
+                    continue
+                _field = self.get_def_field(inst)
+                if _field is not None:
+                    _defs.setdefault(inst[_field], []).append(inst)
+            for _reg, _insts in _defs.items():
+                if len(_insts) == 1 and _insts[0][0].startswith("literal_"):
+                    self.peephole_literals[_reg] = _insts[0][1]
+
+            _code = []
+            _pending = list(reversed(self.enumerated_code))
+            while _pending:
+                _code.append(_pending.pop())
+                for _name, _size in peephole_rules:
+                    if len(_code) < _size:
+                        continue
+                    _window = _code[-_size:]
+                    _replacement = getattr(self, "peephole_" + _name)(*_window)
+                    if _replacement is None:
+                        continue
+                    for inst in _window:
+                        self.count_peephole_uses(inst, -1)
+                    for inst in _replacement:
+                        self.count_peephole_uses(inst, 1)
+                    del _code[-_size:]
+                    _pending += reversed(_replacement)
+                    self.peephole_counts[_name] += 1
+                    _changed = True
+                    break
+
+            self.enumerated_code = _code
+        self.build_def_use()
+
+    def count_peephole_uses(self, inst, amount):
+        """
+        Atualiza a contagem de usos dos registradores lidos pela instrução.
+        """
+        for _field in self.get_use_fields(inst):
+            self.peephole_uses[inst[_field]] = self.peephole_uses.get(inst[_field], 0) + amount
+
+    def peephole_jump_to_next_label(self, jump, label):
+        """
+        jump %L; L: -> L:
+        """
+        if jump[0] == "jump" and self.is_label(label) and jump[1][1:] + ":" == label[0]:
+            return [label]
+        return None
+
+    def peephole_self_copy(self, inst):
+        """
+        load_<tipo> %a %a -> (nada)
+        """
+        if self.is_copy(inst) and inst[1] == inst[2]:
+            return []
+        return None
+
+    def peephole_not_cbranch(self, inst, branch):
+        """
+        not_bool %a %b; cbranch %b %T %F -> cbranch %a %F %T, se %b não é
+        usado em outro lugar.
+        """
+        if (
+            inst[0] == "not_bool"
+            and branch[0] == "cbranch"
+            and branch[1] == inst[2]
+            and self.peephole_uses.get(inst[2]) == 1
+        ):
+            return [("cbranch", inst[1], branch[3], branch[2])]
+        return None
+
+    def peephole_add_zero(self, inst):
+        """
+        add_int %x %zero %t (ou %zero %x) -> load_int %x %t
+        """
+        if inst[0] in ("add_int", "sub_int") and self.peephole_literals.get(inst[2]) == 0:
+            return [("load_int", inst[1], inst[3])]
+        if inst[0] == "add_int" and self.peephole_literals.get(inst[1]) == 0:
+            return [("load_int", inst[2], inst[3])]
+        return None
+
+    def peephole_sitofp_fptosi(self, first, second):
+        """
+        sitofp %a %b; fptosi %b %c -> load_int %a %c, se %b não é usado em
+        outro lugar.
+        """
+        if (
+            first[0] == "sitofp"
+            and second[0] == "fptosi"
+            and second[1] == first[2]
+            and self.peephole_uses.get(first[2]) == 1
+        ):
+            return [("load_int", first[1], second[2])]
+        return None
+
+    def peephole_store_after_load(self, load, store):
+        """
+        load_<tipo> %x %t; store_<tipo> %t %x -> load_<tipo> %x %t
+        """
+        if (
+            load[0].startswith("load_")
+            and store[0] == "store_" + load[0][5:]
+            and store[1] == load[2]
+            and store[2] == load[1]
+        ):
+            return [load]
+        return None
+
+    def peephole_load_after_store(self, store, load):
+        """
+        store_<tipo> %v %x; load_<tipo> %x %t -> store_<tipo> %v %x;
+        load_<tipo> %v %t, que copia o registrador em vez de ler a variável.
+        """
+        if (
+            store[0].startswith("store_")
+            and load[0] == "load_" + store[0][6:]
+            and load[1] == store[2]
+            and load[1] != store[1]
+        ):
+            if len(store[0].split("_")) == 2 and self.is_register(store[1]):
+                return [store, (load[0], store[1], load[2])]
+        return None
+
+    def peephole_repeated_store(self, first, second):
+        """
+        store_<tipo> %v %x; store_<tipo> %w %x -> store_<tipo> %w %x
+        """
+        if (
+            first[0].startswith("store_")
+            and second[0] == first[0]
+            and len(first[0].split("_")) == 2
+            and first[2] == second[2]
+        ):
+            return [second]
+        return None
 
     def appendOptimizedCode(self, cfg):
         """
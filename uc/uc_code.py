@@ -26,13 +26,44 @@ binary_ops = {
     "!": "not",
 }
 
+# Avaliação das operações da uCIR sobre constantes, com a semântica do interpretador
+constant_folding = {
+    "add_int": lambda a, b: a + b,
+    "sub_int": lambda a, b: a - b,
+    "mul_int": lambda a, b: a * b,
+    "div_int": lambda a, b: a // b,
+    "mod_int": lambda a, b: a % b,
+    "add_float": lambda a, b: a + b,
+    "sub_float": lambda a, b: a - b,
+    "mul_float": lambda a, b: a * b,
+    "div_float": lambda a, b: a / b,
+    "lt_int": lambda a, b: a < b,
+    "le_int": lambda a, b: a <= b,
+    "gt_int": lambda a, b: a > b,
+    "ge_int": lambda a, b: a >= b,
+    "eq_int": lambda a, b: a == b,
+    "ne_int": lambda a, b: a != b,
+    "lt_float": lambda a, b: a < b,
+    "le_float": lambda a, b: a <= b,
+    "gt_float": lambda a, b: a > b,
+    "ge_float": lambda a, b: a >= b,
+    "eq_float": lambda a, b: a == b,
+    "ne_float": lambda a, b: a != b,
+    "eq_bool": lambda a, b: a == b,
+    "ne_bool": lambda a, b: a != b,
+    "and_bool": lambda a, b: a and b,
+    "or_bool": lambda a, b: a or b,
+    "not_bool": lambda a: not a,
+    "sitofp": lambda a: float(a),
+    "fptosi": lambda a: int(a),
+}
+
 # Cria um enum das etapas da geração de código
 from enum import Enum
 
 class Etapa(Enum):
     GLOBAL_VARIABLES = 1
-    ALLOCATE = 2
-    CODE_GENERATION = 3
+    CODE_GENERATION = 2
 
 class LoopType(Enum):
     FOR = 1
@@ -140,12 +171,14 @@ class CodeGenerator(NodeVisitor):
         self.code: List[Tuple[str]] = []
 
         self.text: List[Tuple[str]] = []  # Used for global declarations & constants (list, strings)
+        self.constants: Dict[Tuple[str, str], str] = {}  # Constant pool: (opcode, value) -> global name
 
         # TODO: Complete if needed.
         self.etapa = Etapa.GLOBAL_VARIABLES
         self.label = Label()
         self.variable = Variable()
         self.globals = []
+        self.allocations = []  # Alocações da função atual, colocadas no bloco de entrada no final
         self.returnRegister = None
         self.currentLoopType = None # LoopType.FOR or LoopType.WHILE
 
@@ -174,6 +207,46 @@ class CodeGenerator(NodeVisitor):
         self.globals.append(typename)
         return name
     
+    def new_constant(self, opcode: str, value, typename: str) -> str:
+        """
+        Get the global that holds a literal constant. The global is created on
+        the text section only the first time the (opcode, value) pair is used,
+        so identical literals share the same global.
+        """
+        _key = (opcode, str(value))
+        if _key not in self.constants:
+            _target = self.new_text(typename)
+            self.text.append((opcode, _target, value))
+            self.constants[_key] = _target
+        return self.constants[_key]
+
+    def fold_constant(self, node: Node):
+        """
+        Evaluate a constant subtree at compile time. Return the value, or None if
+        the subtree depends on run time values (or would fail at run time, like a
+        division by zero).
+        """
+        if isinstance(node, Constant):
+            if node.type == "int":
+                return int(node.value)
+            return None
+        if not isinstance(node, BinaryOp) or node.op not in binary_ops:
+            return None
+
+        _left = self.fold_constant(node.left)
+        if _left is None:
+            return None
+        _right = self.fold_constant(node.right)
+        if _right is None:
+            return None
+
+        # Mantém a divisão por zero para o tempo de execução
+        _type = "bool" if isinstance(_left, bool) else "float" if isinstance(_left, float) else "int"
+        _opcode = binary_ops[node.op] + "_" + _type
+        if _opcode not in constant_folding or (binary_ops[node.op] in ("div", "mod") and _right == 0):
+            return None
+        return constant_folding[_opcode](_left, _right)
+
     def new_global(self, name: str):
         """
         Create a new global variable.
@@ -212,6 +285,14 @@ class CodeGenerator(NodeVisitor):
         inst = (blockLabel + ":",)
         self.current_block.append(inst)
 
+    def create_alloc_instruction(self, inst: Tuple[str]):
+        """
+        Add an allocation to the side buffer of the current function. The buffer
+        is spliced into the entry block once the whole function was generated.
+        """
+        if inst not in self.allocations:
+            self.allocations.append(inst)
+
     def create_jump_instruction(self, targetLabel: str):
         """
         Create a jump instruction to a target label.
@@ -219,6 +300,26 @@ class CodeGenerator(NodeVisitor):
         inst = ("jump", "%" + targetLabel)
         self.current_block.append(inst)
 
+    def create_branch_instruction(self, cond: Node, trueLabel: str, falseLabel: str):
+        """
+        Generate the evaluation of a condition and branch to the true or false label.
+        The && and || operators are lowered to control flow, so the right operand
+        is only evaluated when it decides the result.
+        """
+        if isinstance(cond, BinaryOp) and cond.op in ("&&", "||"):
+            # Bloco que avalia o operando da direita
+            rhsLabel = self.label.make_label("and.rhs" if cond.op == "&&" else "or.rhs")
+            if cond.op == "&&":
+                self.create_branch_instruction(cond.left, rhsLabel, falseLabel)
+            else:
+                self.create_branch_instruction(cond.left, trueLabel, rhsLabel)
+            self.connect_next_block(BasicBlock(rhsLabel), rhsLabel)
+            self.create_branch_instruction(cond.right, trueLabel, falseLabel)
+        else:
+            self.visit(cond)
+            inst = ("cbranch", cond.gen_location, "%" + trueLabel, "%" + falseLabel)
+            self.current_block.append(inst)
+
     # You must implement visit_Nodename methods for all of the other
     # AST nodes.  In your code, you will need to make instructions
     # and append them to the current block code list.
@@ -258,12 +359,12 @@ class CodeGenerator(NodeVisitor):
 
     def visit_FuncDef(self, node: Node):
         """Initialize the necessary blocks to construct the CFG of the function.
-        Visit the function declaration. Visit all the declarations within the function.
-        After allocating all declarations, visit the arguments initialization.
-        Visit the body of the function to generate its code.
+        Visit the function declaration and the body in a single traversal. The allocations
+        are collected in a side buffer and spliced into the entry block afterwards.
         Finally, setup the return block correctly and generate the return statement (even for void function)."""
 
-        self.etapa = Etapa.ALLOCATE
+        self.etapa = Etapa.CODE_GENERATION
+        self.allocations = []
 
         # Muda para o escopo da função
         self.fname = node.decl.name.name
@@ -289,20 +390,14 @@ class CodeGenerator(NodeVisitor):
         if _typename != "void":
             self.returnRegister = self.new_temp()
             inst = ("alloc_" + _typename, self.returnRegister)
-            self.current_block.append(inst)
-
-        # Visita apenas as declarações de variáveis fase no body
-        self.visit(node.body)
-        
-        # change stage to "code generation"
-        self.etapa = Etapa.CODE_GENERATION
-
-        # Visita a declaração da função
-        self.visit(node.decl)
+            self.create_alloc_instruction(inst)
 
         # Visita o código da função
         self.visit(node.body)
 
+        # Coloca as alocações no bloco de entrada, logo após a label
+        node.cfg.instructions[2:2] = self.allocations
+
         self.label.clear_labels()
 
         # Cria um bloco de retorno
@@ -311,9 +406,10 @@ class CodeGenerator(NodeVisitor):
         # Configura o bloco atual para ser o bloco de retorno
         ret_block.predecessors.append(self.current_block)
 
-        # Cria a instrução de pulo para o retorno
-        inst = ("jump", "%" + "exit")
-        self.current_block.append(inst)
+        # Cria a instrução de pulo para o retorno, se o bloco ainda não saltou
+        _last = self.current_block.instructions[-1] if self.current_block.instructions else None
+        if _last is None or _last[0] != "jump":
+            self.create_jump_instruction("exit")
 
         # Cria a instrução de saída da função
         inst = ("exit:",)
@@ -387,108 +483,87 @@ class CodeGenerator(NodeVisitor):
                 _type = int(node.decl.init.value)
             inst = ('global_' + node.type.name, self.get_address(node.declname), _type)
             self.text.append(inst)
-        if self.etapa == Etapa.ALLOCATE:
-            # Se tiver inicialização, visita a inicialização
-            if node.decl.init is not None:
-                # Visita Constant
-                self.visit(node.decl.init)
-
+        elif self.etapa == Etapa.CODE_GENERATION:
             # Allocate on stack memory
             _name = node.declname.name
             _type = node.type.name
             self.variable.new_var(_name)
             _varname = self.get_address(node.declname)
             inst = ("alloc_" + _type, _varname)
-            self.current_block.append(inst)
+            self.create_alloc_instruction(inst)
 
-        elif self.etapa == Etapa.CODE_GENERATION:
-            # Pega o gen_location do ID
-            # Visita ID
-            self.visit(node.declname)
-
-            # Store optional init val
+            # Store optional init val, evaluated at the declaration point
             _init = node.decl.init
-            inst = None
-            if _init is not None and isinstance(_init, Constant):
-                inst = (
-                    "store_" + node.type.name,
-                    self.get_address(_init),
-                    self.get_address(node.declname),
-                )
-                self.current_block.append(inst)
-            elif _init is not None and isinstance(_init, ID) or isinstance(_init, BinaryOp):
-                inst = (
-                    "store_" + node.type.name,
-                    _init.gen_location,
-                    self.get_address(node.declname),
-                )
-                self.current_block.append(inst)
+            _value = None
+            if _init is not None:
+                self.visit(_init)
+                _value = _init.gen_location
             elif hasattr(node, 'gen_location'):
-                inst = (
-                    "store_" + node.type.name,
-                    node.gen_location,
-                    self.get_address(node.declname),
-                )
-                self.current_block.append(inst)
+                # Argumento da função
+                _value = node.gen_location
 
-            if inst is not None:
+            if _value is not None:
+                inst = ("store_" + _type, _value, _varname)
                 self.current_block.append(inst)
 
     def visit_ArrayDecl(self, node: Node):
         """Visit the node type of an array declaration."""
-        # Aloca coisas globais
-        if self.etapa == Etapa.GLOBAL_VARIABLES or self.etapa == Etapa.ALLOCATE:
-            _inst_name = "global_" + node.type.type.name
-            _typename = None
-            _list = []
-
-            if node.decl.init is not None:
-                # Configurar dimensão do array
-                if hasattr(node.decl.init, 'dimension'):
-                    for dim in node.decl.init.dimension:
-                        _inst_name += "_" + str(dim)
-                
-                if hasattr(node.decl.init, 'exprs'):
-                    for elem in node.decl.init.exprs:
-                        _value = elem.value
-                        if node.type.type.name == "int":
-                            _value = int(elem.value)
-                        _list.append(_value)
-
-            if self.etapa == Etapa.GLOBAL_VARIABLES:
-                self.new_global(node.type.declname.name)
-                _typename = "@" + node.type.declname.name
-            elif self.etapa == Etapa.ALLOCATE:
-                _typename = self.new_text("const_" + node.type.declname.name)
+        _inst_name = "global_" + node.type.type.name
+        _list = []
 
+        if node.decl.init is not None:
+            # Configurar dimensão do array
+            if hasattr(node.decl.init, 'dimension'):
+                for dim in node.decl.init.dimension:
+                    _inst_name += "_" + str(dim)
+
+            if hasattr(node.decl.init, 'exprs'):
+                for elem in node.decl.init.exprs:
+                    _value = elem.value
+                    if node.type.type.name == "int":
+                        _value = int(elem.value)
+                    _list.append(_value)
+
+        # Aloca coisas globais
+        if self.etapa == Etapa.GLOBAL_VARIABLES:
+            self.new_global(node.type.declname.name)
+            _typename = "@" + node.type.declname.name
             inst = (_inst_name, _typename, _list)
             self.text.append(inst)
-        
+
         # Aloca espaço para variáveis
-        if self.etapa == Etapa.ALLOCATE:
+        elif self.etapa == Etapa.CODE_GENERATION:
             _name = node.declname.name
             _type = node.type.type.name
 
             if hasattr(node.decl.init, 'dimension'):
                 for dim in node.decl.init.dimension:
                     _type += "_" + str(dim)
+            elif node.dim is not None:
+                _type += "_" + str(self.fold_constant(node.dim))
 
             self.variable.new_var(_name)
             _varname = self.get_address(node.declname)
 
             inst = ("alloc_" + _type, _varname)
-            self.current_block.append(inst)
+            self.create_alloc_instruction(inst)
+
+            # Copia os valores iniciais, guardados no pool de constantes
+            if hasattr(node.decl.init, 'exprs'):
+                _typename = self.new_constant(_inst_name, _list, "const_" + node.type.declname.name)
+                inst = ("store_" + _type, _typename, _varname)
+                self.current_block.append(inst)
 
     def visit_FuncDecl(self, node: Node):
         """Generate the function definition (including function name, return type, and argument types).
         Generate the entry point for the function, allocate a temporary for the return statement (if not a void function),
         and visit the arguments."""
-        if self.etapa == Etapa.ALLOCATE:
+        if self.etapa == Etapa.CODE_GENERATION:
             _funcType = node.type.type.name
             _funcName = node.type.declname.name
             _paramList = []
 
-            # Cria a definição da função (FALTA OS ARGUMENTOS)
+            # Cria a definição da função
             inst = ("define_" + _funcType, "@" + _funcName, _paramList)
             self.current_block.append(inst)
 
@@ -496,20 +571,16 @@ class CodeGenerator(NodeVisitor):
             inst = ("entry:",)
             self.current_block.append(inst)
 
-            # Cria um novo bloco para a função
             if node.params is not None:
-                self.visit(node.params)
-
                 # Cria array de argumentos
-                for _param in node.params.params:                    
+                for _param in node.params.params:
                     # Cria gen_location do argumento
                     _param.type.gen_location = self.new_temp()
 
                     # Adiciona o argumento na lista de argumentos
                     _paramList.append((_param.type.uc_type.typename, _param.type.gen_location))
-        elif self.etapa == Etapa.CODE_GENERATION:
-            # Cria um novo bloco para a função
-            if node.params is not None:
+
+                # Aloca os argumentos e guarda os valores recebidos
                 self.visit(node.params)
 
     def visit_DeclList(self, node: Node):
@@ -529,17 +600,13 @@ class CodeGenerator(NodeVisitor):
         Generate the evaluation of the condition, create the required blocks and the branch for the condition.
         Move to the first block, generate the statement related to the 'then' branch, and create the branch to exit.
         If there is an 'else' block, generate it in a similar way."""
-        # Visita a condição
-        self.visit(node.cond)
-
         # Cria as labels do if
         thenLabel = self.label.make_label('if.then')
         ifFalseLabel = self.label.make_label('if.end')
         exitIfLabel = self.label.make_label('if.exit')
 
-        # Cria a branch para os blocos do if
-        branch = ('cbranch', node.cond.gen_location, "%" + thenLabel, "%" + ifFalseLabel)
-        self.current_block.append(branch)
+        # Visita a condição e cria a branch para os blocos do if
+        self.create_branch_instruction(node.cond, thenLabel, ifFalseLabel)
 
         # Cria o blocos
         thenBlock = BasicBlock(thenLabel)
@@ -587,11 +654,6 @@ class CodeGenerator(NodeVisitor):
         # Determina o loop atual
         self.currentLoopType = LoopType.FOR
 
-        # Alocar declarações do for
-        self.etapa = Etapa.ALLOCATE
-        self.visit(node.init) # Visita DeclList
-        self.etapa = Etapa.CODE_GENERATION
-
         # Visita a inicialização
         self.visit(node.init)
 
@@ -618,12 +680,8 @@ class CodeGenerator(NodeVisitor):
         # Conecta o bloco de condição
         self.connect_next_block(condBlock, condLabel)
 
-        # Visita a condição
-        self.visit(node.cond)
-
-        # Cria a instrução de branch para os labels do for
-        branch = ('cbranch', node.cond.gen_location, "%" + bodyLabel, "%" + endLabel)
-        self.current_block.append(branch)
+        # Visita a condição e cria a branch para os labels do for
+        self.create_branch_instruction(node.cond, bodyLabel, endLabel)
 
         # Conecta o bloco do body
         self.connect_next_block(bodyBlock, bodyLabel)
@@ -658,15 +716,6 @@ class CodeGenerator(NodeVisitor):
         # Cria um novo escopo de variáveis
         self.variable.create_scope()
 
-        # Etapa de alocar declarações
-        self.etapa = Etapa.ALLOCATE
-
-        self.visit(node.cond)
-        self.visit(node.body)
-        
-        # Etapa de gerar código
-        self.etapa = Etapa.CODE_GENERATION
-
         # Cria as labels do while
         condLabel = self.label.make_label("while.cond")
         bodyLabel = self.label.make_label("while.body")
@@ -684,12 +733,8 @@ class CodeGenerator(NodeVisitor):
         # Conecta o bloco de condição
         self.connect_next_block(condBlock, condLabel)
 
-        # Visita a condição
-        self.visit(node.cond)
-
-        # Cria a instrução de branch para os labels do while
-        branch = ('cbranch', node.cond.gen_location, "%" + bodyLabel, "%" + endLabel)
-        self.current_block.append(branch)
+        # Visita a condição e cria a branch para os labels do while
+        self.create_branch_instruction(node.cond, bodyLabel, endLabel)
 
         # Conecta o bloco do body
         self.connect_next_block(bodyBlock, bodyLabel)
@@ -713,16 +758,15 @@ class CodeGenerator(NodeVisitor):
         if node.citens is None:
             return
 
-        # Visita apenas as declarações
-        if self.etapa == Etapa.ALLOCATE:
-            for _decl in node.citens:
-                if isinstance(_decl, Decl):
-                    self.visit(_decl)
+        # Cria um novo escopo de variáveis
+        self.variable.create_scope()
 
-        # Visita tudo
-        if self.etapa == Etapa.CODE_GENERATION:
-            for element in node.citens:
-                self.visit(element)
+        # Visita tudo, as declarações alocam no buffer da função
+        for element in node.citens:
+            self.visit(element)
+
+        # Limpa o escopo de variáveis
+        self.variable.pop_scope()
 
     def visit_Assignment(self, node: Node):
         """Generate code for the Assignment statement.
@@ -731,10 +775,16 @@ class CodeGenerator(NodeVisitor):
         self.visit(node.rvalue)
 
         if isinstance(node.lvalue, ArrayRef):
+            # Calcula o endereço do elemento e armazena por referência
             _type = node.lvalue.uc_type.type.typename
+            self.visit(node.lvalue.subscript)
+            _address = self.new_temp()
+            inst = ("elem_" + _type, self.get_address(node.lvalue), node.lvalue.subscript.gen_location, _address)
+            self.current_block.append(inst)
+            inst = ('store_' + _type + "_*", node.rvalue.gen_location, _address)
         else:
             _type = node.lvalue.uc_type.typename
-        inst = ('store_' + _type, node.rvalue.gen_location, self.get_address(node.lvalue))
+            inst = ('store_' + _type, node.rvalue.gen_location, self.get_address(node.lvalue))
         self.current_block.append(inst)
 
     def visit_Break(self, node: Node):
@@ -775,13 +825,8 @@ class CodeGenerator(NodeVisitor):
         If the expression is true, proceed to the next statement.
         Generate code similar to the If block to handle the assertion."""
         
-        # Visita a expressão (Binary Op por exemplo)
-        self.visit(node.expr)
-
         # Declara string de erro global para caso o assert falhe
-        _target = self.new_text("str")
-        inst = ("global_string", _target, 'assertion_fail on ' + str(node.expr.coord))
-        self.text.append(inst)
+        _target = self.new_constant("global_string", 'assertion_fail on ' + str(node.expr.coord), "str")
 
         # Cria as labels do assert
         condLabel = self.label.make_label("assert")
@@ -802,9 +847,8 @@ class CodeGenerator(NodeVisitor):
         self.current_block.next_block = condBlock
         self.current_block = condBlock
 
-        # Cria instrução de branch para os blocos de true e false
-        inst = ("cbranch", node.expr.gen_location, "%" + trueLabel, "%" + falseLabel)
-        self.current_block.append(inst)
+        # Visita a expressão e cria a branch para os blocos de true e false
+        self.create_branch_instruction(node.expr, trueLabel, falseLabel)
 
         # Monta o bloco do false
         self.connect_next_block(falseBlock, falseLabel)
@@ -869,14 +913,16 @@ class CodeGenerator(NodeVisitor):
         """Generate code for the Return statement.
         If there is an expression, visit it, load it if necessary, and store its value to the return location.
         Then, generate a jump to the return block if needed. Update the predecessor of the return block."""
-        
-        # THIS SHOULDN'T HANDLE EXIT FUNCITON, FUNDEF MUST HANDLE THIS
+
         if node.expr is not None:
             self.visit(node.expr)
             _typename = node.expr.uc_type.typename
             inst = ('store_' + _typename, node.expr.gen_location, self.returnRegister)
             self.current_block.append(inst)
 
+        # Salta para o bloco de retorno
+        self.create_jump_instruction("exit")
+
     # EXPRESSIONS
 
     def visit_Constant(self, node: Node):
@@ -884,9 +930,7 @@ class CodeGenerator(NodeVisitor):
         If the constant is of type string, create a new global that will contain the value.
         Otherwise, create a new temporary initialized with the value."""
         if node.uc_type.typename == "string":
-            _target = self.new_text("str")
-            inst = ("global_string", _target, node.value)
-            self.text.append(inst)
+            _target = self.new_constant("global_string", node.value, "str")
         else:
             # Create a new temporary variable name
             _target = self.new_temp()
@@ -913,7 +957,17 @@ class CodeGenerator(NodeVisitor):
         """Generate code for the Binary Operation node.
         Visit the left and right expressions to generate the code related to them.
         Load their value if they reference an array.
-        Create a new instruction with the correct opcode and store its result in a new temporary variable."""
+        Create a new instruction with the correct opcode and store its result in a new temporary variable.
+        Constant subtrees are folded and produce a single literal."""
+        # Avalia em tempo de compilação quando os operandos são constantes
+        _value = self.fold_constant(node)
+        if _value is not None:
+            node.gen_location = self.new_temp()
+            _type = "bool" if isinstance(_value, bool) else "float" if isinstance(_value, float) else "int"
+            inst = ("literal_" + _type, _value, node.gen_location)
+            self.current_block.append(inst)
+            return
+
         # Visit the left and right expressions
         self.visit(node.left)
         self.visit(node.right)
@@ -157,11 +157,22 @@ class Compiler:
             self.gen.show(buf=self.ir_file)
 
     def _opt(self):
-        self.opt = DataFlow(self.args.cfg)
+        self.opt = DataFlow(
+            self.args.cfg,
+            unroll_threshold=self.args.unroll_threshold,
+            unroll_factor=self.args.unroll_factor,
+            unroll_budget=self.args.unroll_budget,
+            inline_threshold=self.args.inline_threshold,
+            specialize_threshold=self.args.specialize_threshold,
+            rotate_threshold=self.args.rotate_threshold,
+        )
         self.opt.visit(self.ast)
         self.optcode = self.opt.code
         if not self.args.yaml and self.opt_file is not None:
             self.opt.show(buf=self.opt_file)
+        if self.args.verbose:
+            for _rule, _count in self.opt.peephole_counts.items():
+                sys.stderr.write("peephole %s: %d\n" % (_rule, _count))
 
     # def _llvm(self):
     #     self.llvm = LLVMCodeGenerator(self.args.cfg)
@@ -321,6 +332,42 @@ if __name__ == "__main__":
         help="optimize the uCIR with const prop and dce",
         action="store_true",
     )
+    parser.add_argument(
+        "--unroll-threshold",
+        type=int,
+        default=8,
+        help="fully unroll loops with at most this many iterations",
+    )
+    parser.add_argument(
+        "--unroll-factor",
+        type=int,
+        default=1,
+        help="replicate the body of inner loops this many times (1 disables)",
+    )
+    parser.add_argument(
+        "--unroll-budget",
+        type=int,
+        default=32,
+        help="max number of instructions added when unrolling a loop",
+    )
+    parser.add_argument(
+        "--inline-threshold",
+        type=int,
+        default=20,
+        help="inline functions with at most this many instructions (0 disables)",
+    )
+    parser.add_argument(
+        "--specialize-threshold",
+        type=int,
+        default=40,
+        help="clone functions with at most this many instructions for constant arguments of calls inside loops (0 disables)",
+    )
+    parser.add_argument(
+        "--rotate-threshold",
+        type=int,
+        default=2,
+        help="rotate loops whose test has at most this many instructions into do-while form (0 disables)",
+    )
     parser.add_argument(
         "-v",
         "--verbose",
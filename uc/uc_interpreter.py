@@ -526,6 +526,7 @@ class Interpreter:
         M[self.vars[target]] = value
 
     run_literal_float = run_literal_int
+    run_literal_bool = run_literal_int
 
     def run_literal_char(self, value, target):
         self._alloc_reg(target)